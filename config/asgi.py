@@ -13,4 +13,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# The ASGI process only serves the async views; everything else stays on the WSGI
+# process, where sync views get real threads and persistent DB connections
+ASGI_PATH_PREFIXES = ("/api/async/", "/api/ready/")
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and not scope["path"].startswith(ASGI_PATH_PREFIXES):
+        await send({
+            "type": "http.response.start",
+            "status": 404,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": b'{"detail": "Not found."}'})
+        return
+    await django_application(scope, receive, send)
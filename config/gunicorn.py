@@ -0,0 +1,84 @@
+"""
+Gunicorn configuration for production (see the Procfile).
+
+The app is preloaded in the master, which then warms the catalog and slot-plan
+snapshots (programs.warmup), freezes the GC and closes its DB connections before
+forking. Workers inherit the warmed memory copy-on-write instead of each building
+their own on the first requests.
+
+Two processes use it (see the Procfile):
+  web  - config.wsgi with threaded (gthread) workers, serving /api/. Sync views run
+         on real threads and keep their CONN_MAX_AGE connections between requests.
+  asgi - config.asgi with GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker, serving
+         only /api/async/ (and /api/ready/); route that prefix to it at the proxy.
+
+Tune with env vars: WEB_CONCURRENCY (workers), GUNICORN_THREADS, GUNICORN_WORKER_CLASS,
+GUNICORN_PRELOAD, GUNICORN_TIMEOUT, PORT.
+"""
+
+import gc
+import os
+
+
+def _cpu_count():
+    # Respect CPU affinity / container limits where the OS exposes them
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+cpus = _cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+# Threaded workers get fewer processes and CPU-proportional threads. Other classes keep
+# the classic 2 * CPUs + 1 (threads is ignored by them); async workers multiplex the
+# async views on an event loop.
+if worker_class == "gthread":
+    workers = int(os.environ.get("WEB_CONCURRENCY", cpus + 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", max(2, cpus * 2)))
+else:
+    workers = int(os.environ.get("WEB_CONCURRENCY", cpus * 2 + 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", 1))
+
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    # Runs in the master once the (preloaded) app is imported, before any worker forks
+    if not preload_app:
+        return
+    from programs.warmup import warm
+
+    summary = warm()
+    server.log.info("Warmed before fork: %s", summary)
+    # Keep the warmed objects out of GC passes so collections in the workers don't
+    # touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    # Without preload every worker warms itself before accepting traffic
+    if not preload_app:
+        from programs.warmup import warm
+
+        warm()
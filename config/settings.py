@@ -7,6 +7,7 @@ from datetime import timedelta
 import environ
 import os
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 # ----------------------------
 # Base Directory
@@ -28,9 +29,18 @@ environ.Env.read_env(os.path.join(BASE_DIR, '.env'))
 # ----------------------------
 SECRET_KEY = env('SECRET_KEY', default='temporary_secret_for_dev')  # only for local/dev
 BREVO_API_KEY = env('BREVO_API_KEY', default='')
+BREVO_API_HOST = env('BREVO_API_HOST', default='https://api.sendinblue.com/v3')
+BREVO_POOL_MAXSIZE = env.int('BREVO_POOL_MAXSIZE', default=10)  # kept-alive connections per process
+BREVO_BULK_BATCH_SIZE = env.int('BREVO_BULK_BATCH_SIZE', default=100)  # message versions per API call
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='admin@example.com')
 DEBUG = env.bool('DEBUG', default=True)
 
+# Email outbox (drained by `manage.py send_outbox_emails`)
+# Transports: programs.outbox.BrevoTransport / FileTransport / MemoryTransport
+EMAIL_OUTBOX_TRANSPORT = env('EMAIL_OUTBOX_TRANSPORT', default='programs.outbox.BrevoTransport')
+EMAIL_OUTBOX_FILE_PATH = env('EMAIL_OUTBOX_FILE_PATH', default=os.path.join(BASE_DIR, 'sent_emails'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5)
+
 ALLOWED_HOSTS = ['*']
 
 # ----------------------------
@@ -54,6 +64,8 @@ INSTALLED_APPS = [
 # Middleware
 # ----------------------------
 MIDDLEWARE = [
+    'programs.middleware.RequestMetricsMiddleware',
+    'programs.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,8 +73,35 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'programs.middleware.ProfilingMiddleware',
 ]
 
+# ----------------------------
+# Metrics (/api/metrics/, admin only)
+# ----------------------------
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+# Shared directory (e.g. a tmpfs) where each gunicorn worker dumps its metrics; empty = this process only
+METRICS_DIR = env('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = env.int('METRICS_FLUSH_INTERVAL', default=5)
+
+# ----------------------------
+# Profiling (/api/profiles/, admin only)
+# ----------------------------
+# Staff can profile any request with `X-Profile: 1` or `?profile=1`
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=True)
+# Share of all requests profiled automatically (0.0 - 1.0)
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+PROFILING_DIR = env('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_CAPTURES = env.int('PROFILING_MAX_CAPTURES', default=200)
+
+# ----------------------------
+# Catalog snapshot file
+# ----------------------------
+# Binary export written by `manage.py export_catalog_snapshot`. When set (and the file
+# exists) the catalog and slot plans are read from it via mmap instead of the DB;
+# re-export after editing exercises, prescriptions or slots.
+CATALOG_SNAPSHOT_PATH = env('CATALOG_SNAPSHOT_PATH', default='')
+
 # ----------------------------
 # URLs & WSGI
 # ----------------------------
@@ -88,15 +127,87 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # ----------------------------
 # Database
 # ----------------------------
-DATABASES = {
-    'default': dj_database_url.config(
-        default='sqlite:///db.sqlite3'
+# Keep connections open between requests (seconds; 0 = close after each request)
+# and ping them before reuse so a dropped connection isn't handed out
+DB_CONN_MAX_AGE = env.int('DB_CONN_MAX_AGE', default=60)
+DB_CONN_HEALTH_CHECKS = env.bool('DB_CONN_HEALTH_CHECKS', default=True)
+# psycopg 3 connection pool (Postgres only; needs `psycopg[pool]` instead of psycopg2).
+# Under ASGI, persistent connections aren't reused across requests, so prefer the pool there.
+DB_POOL = env.bool('DB_POOL', default=False)
+DB_POOL_MIN_SIZE = env.int('DB_POOL_MIN_SIZE', default=2)
+DB_POOL_MAX_SIZE = env.int('DB_POOL_MAX_SIZE', default=10)
+DB_POOL_TIMEOUT = env.int('DB_POOL_TIMEOUT', default=10)
+
+
+def database_config(url):
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
+    if DB_POOL and config['ENGINE'] == 'django.db.backends.postgresql':
+        config['CONN_MAX_AGE'] = 0  # the pool owns connection lifetime
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    return config
+
+
+DATABASES = {
+    'default': database_config(env('DATABASE_URL', default='sqlite:///db.sqlite3')),
+}
+
+# Read replicas (comma-separated URLs), used for catalog and profile reads by
+# programs.db_router.ReplicaRouter. Locally, a second SQLite file works as a stand-in:
+#   DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3
+#   python manage.py migrate --database=replica_1
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[]), start=1):
+    _alias = f'replica_{_index}'
+    DATABASES[_alias] = database_config(_url)
+    # Tests use the primary's test database for the replicas
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['programs.db_router.ReplicaRouter']
+# After a write, the client reads from the primary for this long (should exceed replica lag)
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=5)
+REPLICA_STICKY_COOKIE = env('REPLICA_STICKY_COOKIE', default='db_primary')
+
+# ----------------------------
+# Cache
+# ----------------------------
+# Shared tier behind the per-process LRUs (programs.services.memo.TieredCache) and the
+# store for token-claims stamps; it must be shared by every process so workers see each
+# other's computed plans and invalidations. Point CACHE_URL at Redis (redis://host:6379/0)
+# in production. Without it, DEBUG uses per-process locmem and everything else the
+# database (dbcache://programs_cache, table made by `createcachetable`, see the Procfile).
+# An explicit locmem CACHE_URL is refused outside DEBUG.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://' if DEBUG else 'dbcache://programs_cache'),
 }
+if not DEBUG and CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+    raise ImproperlyConfigured(
+        "CACHE_URL must point at a cache shared by all processes (e.g. redis://) when DEBUG is off; "
+        "with locmem, token invalidations and single-flight builds never leave the process."
+    )
+CACHE_LOCAL_MAXSIZE = env.int('CACHE_LOCAL_MAXSIZE', default=10000)
+CACHE_DEFAULT_TIMEOUT = env.int('CACHE_DEFAULT_TIMEOUT', default=24 * 60 * 60)
+# How long a single-flight build may hold its lock before waiters compute it themselves
+CACHE_LOCK_TIMEOUT = env.int('CACHE_LOCK_TIMEOUT', default=10)
+# Seconds a process trusts the snapshot versions (SnapshotVersion rows) it read before
+# querying them again (0 = on every access). Edits from other processes show up within this.
+CACHE_VERSION_CHECK_INTERVAL = env.float('CACHE_VERSION_CHECK_INTERVAL', default=1.0)
 
 # ----------------------------
 # REST Framework & JWT
 # ----------------------------
+# Let the read-only schedule views trust the profile claims in access tokens instead of
+# loading User/UserProfile per request (programs.auth.ClaimsJWTAuthentication)
+JWT_CLAIMS_AUTH = env.bool('JWT_CLAIMS_AUTH', default=False)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -106,6 +217,14 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Login (/api/login/). Clients only use the JWT, so no session is created unless LOGIN_SESSION
+LOGIN_SESSION = env.bool('LOGIN_SESSION', default=False)
+# last_login on JWT logins: immediate | off | deferred (batched; may lose writes on a
+# killed worker and invalidates reset links issued before the flush, see programs/auth.py)
+LAST_LOGIN_MODE = env('LAST_LOGIN_MODE', default='immediate')
+LAST_LOGIN_BATCH_SIZE = env.int('LAST_LOGIN_BATCH_SIZE', default=500)
+LAST_LOGIN_FLUSH_INTERVAL = env.int('LAST_LOGIN_FLUSH_INTERVAL', default=30)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -20,6 +20,7 @@ from django.views.generic import RedirectView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/async/', include("programs.async_urls")),
     path('api/', include("programs.urls")),
     path('', RedirectView.as_view(url='/api/')),  # root URL redirect
 ]
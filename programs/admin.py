@@ -1,7 +1,18 @@
 from django.contrib import admin
-from .models import Exercise, Prescription
+from .models import Exercise, Prescription, WorkoutSlotLogic, EmailOutbox
 
 # Register your models here.
 
 admin.site.register(Exercise)
 admin.site.register(Prescription)
+
+@admin.register(WorkoutSlotLogic)
+class WorkoutSlotLogicAdmin(admin.ModelAdmin):
+    list_display = ("training_bracket", "phase", "slot_number", "movement_pattern", "base_exercise")
+    list_filter = ("training_bracket", "phase")
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("to_email", "template_name", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "template_name")
+    search_fields = ("to_email",)
@@ -0,0 +1,27 @@
+from django.urls import path
+from .async_views import (
+    AsyncCategoryOptionsView,
+    AsyncAllCategoriesView,
+    AsyncSignupView,
+    AsyncLoginView,
+    AsyncUserScheduleView,
+    AsyncMyWorkoutOptionsView,
+    AsyncForgetPasswordView,
+    AsyncVerifyEmailView,
+    AsyncVerifyResetLinkView,
+    AsyncScheduleExportView,
+)
+
+# Async counterparts of the matching routes in programs/urls.py (served under /api/async/).
+urlpatterns = [
+    path("options/<str:category>/", AsyncCategoryOptionsView.as_view()),
+    path("all-categories/", AsyncAllCategoriesView.as_view()),
+    path("signup/", AsyncSignupView.as_view()),
+    path("login/", AsyncLoginView.as_view(), name="async_login"),
+    path("my-schedule/", AsyncUserScheduleView.as_view()),
+    path("my-options/", AsyncMyWorkoutOptionsView.as_view()),
+    path("forget-password/", AsyncForgetPasswordView.as_view(), name="async_forget_password"),
+    path("verify-email/<uidb64>/<token>/", AsyncVerifyEmailView.as_view(), name="async_verify_email"),
+    path("verify-reset-link/<uidb64>/<token>/", AsyncVerifyResetLinkView.as_view(), name="async_verify_reset_link"),
+    path("admin/export-schedules/", AsyncScheduleExportView.as_view()),
+]
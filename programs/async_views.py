@@ -0,0 +1,288 @@
+# programs/async_views.py
+#
+# Async (ASGI) versions of the read-heavy and auth/email views, mounted under /api/async/
+# with the same request and response shapes as their programs/views.py counterparts.
+# They use the async ORM and cache APIs, so a waiting request holds no thread; password
+# hashing runs in a worker thread to keep the event loop free. Needs an ASGI server
+# (see the Procfile); under WSGI Django runs them in a fresh event loop per request.
+
+import json
+import random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aauthenticate, alogin
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import classonlymethod
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .auth import PROFILE_CLAIM, aclaims_current, claims_user, issue_tokens, record_login
+from .models import UserProfile
+from .outbox import aenqueue_email
+from .serializers import ExerciseSerializer, SignupSerializer, UserProfileSerializer
+from .services.schedule_export import ScheduleExporter
+from .views import _render_all_categories, slot_plan_service, workout_service
+
+ANY, AUTHENTICATED, ADMIN = "any", "authenticated", "admin"
+
+
+class AsyncAPIView(View):
+    """
+    Small async stand-in for DRF's APIView (which can't run async handlers): JSON bodies,
+    JWT authentication and a `permission` of ANY, AUTHENTICATED or ADMIN. Views with
+    `claims_auth` (the read-only schedule ones) may trust token claims, like
+    ClaimsJWTAuthentication.
+    """
+    permission = AUTHENTICATED
+    claims_auth = False
+    jwt = JWTAuthentication()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Bearer tokens, not cookies: CSRF-exempt like APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await self.authenticate(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+            return JsonResponse(detail, status=401)
+        if user is not None:
+            request.user = user
+        if self.permission != ANY and user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        if self.permission == ADMIN and not user.is_staff:
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        header = self.jwt.get_header(request)
+        raw = self.jwt.get_raw_token(header) if header else None
+        if raw is None:
+            return None
+        token = self.jwt.get_validated_token(raw)  # signature and expiry only, no I/O
+
+        user = claims_user(token) if self.claims_auth else None
+        if user is not None and await aclaims_current(user.id, token[PROFILE_CLAIM]):
+            return user
+
+        try:
+            user = await User.objects.select_related("profile").aget(
+                **{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]}
+            )
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+    @staticmethod
+    def data(request):
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+
+async def _hash(password):
+    # CPU-bound: off the event loop, and off the thread the sync ORM calls share
+    return await sync_to_async(make_password, thread_sensitive=False)(password)
+
+
+async def _user_from_uid(uidb64):
+    try:
+        uid = force_str(urlsafe_base64_decode(uidb64))
+        return await User.objects.select_related("profile").aget(pk=uid)
+    except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+        return None
+
+
+# --- AUTHENTICATION VIEWS ---
+
+class AsyncSignupView(AsyncAPIView):
+    permission = ANY
+
+    async def post(self, request):
+        serializer = SignupSerializer(data=self.data(request))
+        # username / email uniqueness checks query the DB
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+
+        data = serializer.validated_data
+        user = await User.objects.acreate(
+            username=User.normalize_username(data["username"]),
+            email=User.objects.normalize_email(data["email"]),
+            password=await _hash(data["password"]),
+        )  # post_save signal creates the profile
+        if data.get("dob"):
+            await UserProfile.objects.filter(user=user).aupdate(dob=data["dob"])
+
+        token = default_token_generator.make_token(user)
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        verify_link = f"http://127.0.0.1:8000/api/verify-email/{uid}/{token}/"
+        context = {"username": user.username, "verify_link": verify_link}
+        await aenqueue_email("Verify Your Email - Gym System", "emails/signup_welcome.html", context, user.email)
+
+        return JsonResponse({"detail": "User created. Verification email sent!"}, status=201)
+
+
+class AsyncLoginView(AsyncAPIView):
+    permission = ANY
+
+    async def post(self, request):
+        data = self.data(request)
+        username, password = data.get("username"), data.get("password")
+        if not username or not password:
+            return JsonResponse({"non_field_errors": ["Both username and password are required."]}, status=401)
+
+        # Same AUTHENTICATION_BACKENDS (and signals, hash upgrades) as the sync login
+        user = await aauthenticate(request, username=username, password=password)
+        if user is None:
+            return JsonResponse({"non_field_errors": ["Invalid username or password."]}, status=401)
+
+        refresh = await sync_to_async(issue_tokens)(user)
+        if settings.LOGIN_SESSION:
+            await alogin(request, user)
+        else:
+            await sync_to_async(record_login)(user)
+        return JsonResponse({"username": user.username, "access": str(refresh.access_token), "refresh": str(refresh)})
+
+
+class AsyncForgetPasswordView(AsyncAPIView):
+    permission = ANY
+
+    async def post(self, request):
+        email = self.data(request).get("email")
+        user = await User.objects.filter(email=email).afirst() if email else None
+        if user is None:
+            return JsonResponse({"detail": "Email not found"}, status=404)
+
+        token = default_token_generator.make_token(user)
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        reset_link = f"http://127.0.0.1:8000/api/verify-reset-link/{uid}/{token}/"
+        context = {"username": user.username, "reset_link": reset_link}
+        await aenqueue_email("Password Reset Request", "emails/reset_password.html", context, email)
+
+        return JsonResponse({"detail": "Reset button sent to email.", "uid": uid, "token": token})
+
+
+class AsyncVerifyEmailView(AsyncAPIView):
+    permission = ANY
+
+    async def get(self, request, uidb64, token):
+        user = await _user_from_uid(uidb64)
+        if user is None:
+            return JsonResponse({"detail": "Invalid verification link."}, status=400)
+        if not default_token_generator.check_token(user, token):
+            return JsonResponse({"detail": "This link is invalid or has expired."}, status=400)
+
+        profile = user.profile
+        profile.is_verified = True
+        otp_code = str(random.randint(100000, 999999))
+        profile.otp = otp_code
+        await profile.asave()
+
+        context = {"username": user.username, "otp": otp_code}
+        await aenqueue_email("Your Gym System OTP Code", "emails/otp_email.html", context, user.email)
+
+        return JsonResponse({"detail": "Email verified! An OTP has been sent to your inbox.", "username": user.username})
+
+
+class AsyncVerifyResetLinkView(AsyncAPIView):
+    permission = ANY
+
+    async def get(self, request, uidb64, token):
+        user = await _user_from_uid(uidb64)
+        if user is None:
+            return JsonResponse({"detail": "Invalid reset link."}, status=400)
+        if not default_token_generator.check_token(user, token):
+            return JsonResponse({"detail": "This reset link has expired."}, status=400)
+
+        otp_code = str(random.randint(100000, 999999))
+        profile = user.profile
+        profile.otp = otp_code
+        await profile.asave(update_fields=["otp"])
+
+        context = {"username": user.username, "otp": otp_code}
+        await aenqueue_email("Your Security OTP Code", "emails/reset_otp.html", context, user.email)
+
+        return JsonResponse({
+            "detail": "Link verified! A security OTP has been sent to your email.",
+            "uid": uidb64,
+            "token": token,
+        })
+
+
+# --- GYM LOGIC VIEWS ---
+
+class AsyncUserScheduleView(AsyncAPIView):
+    claims_auth = True
+
+    async def get(self, request):
+        profile = request.user.profile
+        user_month, bracket, current_phase = profile.current_training_state()
+
+        plan_data = await slot_plan_service.aschedule_plan(bracket, current_phase)
+        if not plan_data:
+            return JsonResponse({"detail": "No workout plan found for your level."}, status=404)
+
+        return JsonResponse({
+            "profile": UserProfileSerializer(profile).data,
+            "current_month": user_month,
+            "bracket": bracket,
+            "phase": current_phase,
+            "16_slot_plan": plan_data,
+        })
+
+
+class AsyncMyWorkoutOptionsView(AsyncAPIView):
+    claims_auth = True
+
+    async def get(self, request):
+        user_month, bracket, phase = request.user.profile.current_training_state()
+        results = await slot_plan_service.aoptions_plan(bracket, phase)
+        return JsonResponse({"month": user_month, "bracket": bracket, "phase": phase, "workout": results})
+
+
+# --- UTILITY VIEWS (CATEGORIES) ---
+
+class AsyncCategoryOptionsView(AsyncAPIView):
+    async def get(self, request, category):
+        snapshot = await workout_service.catalog.aget()
+        return JsonResponse(ExerciseSerializer(snapshot.category_options(category), many=True).data, safe=False)
+
+
+class AsyncAllCategoriesView(AsyncAPIView):
+    permission = ANY
+
+    async def get(self, request):
+        snapshot = await workout_service.catalog.aget()
+        return HttpResponse(snapshot.memo("all-categories.json", _render_all_categories), content_type="application/json")
+
+
+# --- ADMIN VIEWS ---
+
+class AsyncScheduleExportView(AsyncAPIView):
+    permission = ADMIN
+
+    async def get(self, request):
+        gzip = request.GET.get("gzip") in ("1", "true")
+        filename = f"schedules-{timezone.now().date().isoformat()}.ndjson" + (".gz" if gzip else "")
+        response = StreamingHttpResponse(
+            ScheduleExporter(slot_plans=slot_plan_service).achunks(gzip=gzip),
+            content_type="application/gzip" if gzip else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,251 @@
+# programs/auth.py
+#
+# JWT login path: token issuing, stateless claims authentication and last_login bookkeeping.
+#
+# LAST_LOGIN_MODE picks how last_login is kept:
+#   "immediate" - one UPDATE per login (what django.contrib.auth.login() does); default
+#   "off"       - never written
+#   "deferred"  - buffered per process and written in one bulk UPDATE every
+#                 LAST_LOGIN_BATCH_SIZE logins, or LAST_LOGIN_FLUSH_INTERVAL seconds after
+#                 the first buffered one (a timer, so idle workers flush too). Writes still
+#                 pending when a worker is killed are lost. default_token_generator hashes
+#                 last_login, so a password-reset / verification link issued between a
+#                 login and its flush stops working once the flush lands.
+
+import atexit
+import logging
+import threading
+import time
+from datetime import date
+from functools import cached_property
+
+from django.conf import settings
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import training_state
+
+PROFILE_CLAIM = "profile"
+CLAIMS_STAMP_KEY = "programs:claims-stamp:{}"
+
+logger = logging.getLogger(__name__)
+
+
+# --- tokens ---
+
+def token_claims(user):
+    """
+    Claims the schedule endpoints need, so ClaimsJWTAuthentication can serve them
+    without loading User or UserProfile. No staff / superuser flags: those are always
+    read from the DB.
+    """
+    profile = user.profile
+    return {
+        "username": user.username,
+        "is_active": user.is_active,
+        PROFILE_CLAIM: {
+            "training_age": profile.training_age,
+            "training_start_date": _iso(profile.training_start_date),
+            "dob": _iso(profile.dob),
+            "is_verified": profile.is_verified,
+            "issued_at": time.time(),
+        },
+    }
+
+
+def issue_tokens(user):
+    """
+    RefreshToken carrying token_claims(user); its access token (and any access token
+    refreshed from it later) copies them.
+    """
+    refresh = RefreshToken.for_user(user)
+    claims = token_claims(user)
+    for key, value in claims.items():
+        refresh[key] = value
+    # Tokens are only trusted while the user has a stamp older than them; start one
+    # unless an invalidation already left one (which is older than this token anyway)
+    cache.add(CLAIMS_STAMP_KEY.format(user.pk), claims[PROFILE_CLAIM]["issued_at"] - 0.001, _stamp_timeout())
+    return refresh
+
+
+def _stamp_timeout():
+    return int(settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds())
+
+
+def _iso(value):
+    if value is None:
+        return None
+    return value.date().isoformat() if hasattr(value, "date") else value.isoformat()
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+def invalidate_claims(user_id):
+    """
+    Mark every token issued to `user_id` so far as stale (after the current transaction
+    commits). Stale tokens still authenticate, but through the DB until the user logs
+    in again. Needs a cache shared by all workers to reach every process.
+    """
+    invalidate_claims_many([user_id])
+
+
+def invalidate_claims_many(user_ids):
+    user_ids = list(user_ids)
+
+    def stamp():
+        now = time.time()
+        cache.set_many({CLAIMS_STAMP_KEY.format(user_id): now for user_id in user_ids}, _stamp_timeout())
+    transaction.on_commit(stamp)
+
+
+# A missing stamp (expired, evicted, cache flushed) means "unknown", never "current":
+# the token then goes through the DB like any other
+
+def claims_current(user_id, claims):
+    stamp = cache.get(CLAIMS_STAMP_KEY.format(user_id))
+    return stamp is not None and claims.get("issued_at", 0) > stamp
+
+
+async def aclaims_current(user_id, claims):
+    stamp = await cache.aget(CLAIMS_STAMP_KEY.format(user_id))
+    return stamp is not None and claims.get("issued_at", 0) > stamp
+
+
+def claims_user(token):
+    """
+    ClaimsUser for a validated token that carries usable claims, else None. Whether the
+    claims are still current is up to the caller (claims_current / aclaims_current).
+    """
+    if not settings.JWT_CLAIMS_AUTH or not token.get(PROFILE_CLAIM) or token.get("is_active") is not True:
+        return None
+    return ClaimsUser(token)
+
+
+class ClaimsProfile:
+    """
+    Read-only stand-in for UserProfile built from token claims (no otp).
+    """
+
+    def __init__(self, user, claims):
+        self.user = user
+        self.user_id = user.id
+        self.training_age = claims["training_age"]
+        self.training_start_date = _parse_date(claims["training_start_date"])
+        self.dob = _parse_date(claims.get("dob"))
+        self.is_verified = claims.get("is_verified", False)
+
+    @property
+    def current_training_month(self):
+        return self.current_training_state()[0]
+
+    def current_training_state(self, today=None):
+        state = training_state(self.training_age, self.training_start_date, today)
+        return state["training_month"], state["training_bracket"], state["training_phase"]
+
+
+class ClaimsUser(TokenUser):
+    # Never elevated from a token: admin-only views always see a DB-backed User
+    is_staff = False
+    is_superuser = False
+
+    @cached_property
+    def id(self):
+        # same int pk as User.id, so e.g. seeded plans match the DB-backed path
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def profile(self):
+        return ClaimsProfile(self, self.token[PROFILE_CLAIM])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts the claims issue_tokens() put in the access token:
+    request.user is a ClaimsUser and request.user.profile a ClaimsProfile, so
+    authentication costs no queries. Tokens without claims, or not provably newer than
+    the user's stamp (see invalidate_claims()), fall back to the DB lookup.
+
+    Only for the read-only schedule views, and only with JWT_CLAIMS_AUTH; otherwise it
+    is plain JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        user = claims_user(validated_token)
+        if user is not None and claims_current(user.id, validated_token[PROFILE_CLAIM]):
+            return user
+        return super().get_user(validated_token)
+
+
+# --- last_login ---
+
+class LastLoginBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # user_id -> last login time
+        self._timer = None  # flushes LAST_LOGIN_FLUSH_INTERVAL after the first buffered login
+
+    def add(self, user_id, when):
+        with self._lock:
+            self._pending[user_id] = when
+            due = len(self._pending) >= getattr(settings, "LAST_LOGIN_BATCH_SIZE", 500)
+            if not due and self._timer is None:
+                self._timer = threading.Timer(getattr(settings, "LAST_LOGIN_FLUSH_INTERVAL", 30), self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def _timed_flush(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not write buffered last_login values")
+        finally:
+            connection.close()  # this thread's own connection; the thread ends here
+
+    def flush(self):
+        """
+        Write every buffered last_login in a single UPDATE. Returns the number of users written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            timer, self._timer = self._timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if pending:
+            User.objects.bulk_update(
+                [User(pk=user_id, last_login=when) for user_id, when in pending.items()],
+                ["last_login"],
+            )
+        return len(pending)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+last_login_buffer = LastLoginBuffer()
+
+
+def record_login(user):
+    mode = getattr(settings, "LAST_LOGIN_MODE", "immediate")
+    if mode == "immediate":
+        update_last_login(None, user)
+    elif mode == "deferred":
+        user.last_login = timezone.now()
+        last_login_buffer.add(user.pk, user.last_login)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        last_login_buffer.flush()
+    except Exception:
+        logger.exception("Could not write buffered last_login values at exit")
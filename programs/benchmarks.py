@@ -0,0 +1,115 @@
+# programs/benchmarks.py
+#
+# Small timing harness used by `manage.py run_benchmarks`: runs each case N times,
+# recording latency, throughput and DB query counts, and diffs against a JSON baseline.
+
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class BenchCase:
+    name: str
+    fn: object                  # fn(prepared) -> anything; this is what gets timed
+    prepare: object = None      # prepare() -> value passed to fn; runs untimed before each call
+    iterations: int | None = None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+
+class BenchmarkRunner:
+    def __init__(self, iterations=100, warmup=3):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.results = {}
+
+    def run(self, case: BenchCase):
+        iterations = case.iterations or self.iterations
+        prepare = case.prepare or (lambda: None)
+
+        for _ in range(self.warmup):
+            case.fn(prepare())
+
+        timings = []
+        queries = 0
+        query_time = 0.0
+        for _ in range(iterations):
+            prepared = prepare()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                case.fn(prepared)
+                timings.append(time.perf_counter() - start)
+            queries += len(captured)
+            query_time += sum(float(q.get("time") or 0) for q in captured.captured_queries)
+
+        timings.sort()
+        total = sum(timings)
+        result = {
+            "iterations": iterations,
+            "ops_per_sec": round(iterations / total, 1) if total else None,
+            "mean_ms": round(total / iterations * 1000, 3),
+            "p50_ms": round(percentile(timings, 50) * 1000, 3),
+            "p99_ms": round(percentile(timings, 99) * 1000, 3),
+            "queries_per_op": round(queries / iterations, 2),
+            "query_ms_per_op": round(query_time / iterations * 1000, 3),
+        }
+        self.results[case.name] = result
+        return result
+
+
+def format_table(results):
+    lines = [f"{'case':<40} {'iters':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}"]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<40} {r['iterations']:>6} {r['ops_per_sec'] or 0:>10} "
+            f"{r['p50_ms']:>9} {r['p99_ms']:>9} {r['queries_per_op']:>8}"
+        )
+    return lines
+
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Lines describing how `results` moved against `baseline`; the flag is True when
+    any case got slower than `threshold` (p50) or issues more queries.
+    """
+    lines = []
+    regressed = False
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"NEW         {name}")
+            continue
+        slower = base["p50_ms"] and r["p50_ms"] > base["p50_ms"] * (1 + threshold)
+        more_queries = r["queries_per_op"] > base["queries_per_op"]
+        tag = "REGRESSION" if slower or more_queries else "ok"
+        regressed = regressed or tag == "REGRESSION"
+        lines.append(
+            f"{tag:<11} {name}: p50 {base['p50_ms']} -> {r['p50_ms']} ms, "
+            f"queries {base['queries_per_op']} -> {r['queries_per_op']}"
+        )
+    for name in baseline:
+        if name not in results:
+            lines.append(f"MISSING     {name}")
+    return lines, regressed
+
+
+def write_baseline(path, meta, results):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Stable key order so a re-run shows up as a readable git diff
+    path.write_text(json.dumps({"meta": meta, "results": results}, indent=2, sort_keys=True) + "\n")
+
+
+def read_baseline(path):
+    return json.loads(Path(path).read_text())["results"]
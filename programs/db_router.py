@@ -0,0 +1,99 @@
+# programs/db_router.py
+#
+# Sends the read-mostly catalog / schedule reads to the replicas listed in
+# DATABASE_REPLICA_URLS, everything else to "default". Replicas are only used inside
+# a request that hasn't written anything: the first write pins the rest of the
+# request to the primary, and ReplicaStickinessMiddleware keeps the client pinned
+# for REPLICA_STICKY_SECONDS afterwards (a cookie), so users read their own writes
+# while the replicas catch up. Management commands and workers always use the primary.
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Models whose reads may be served by a replica
+REPLICA_MODELS = {
+    "programs.exercise",
+    "programs.prescription",
+    "programs.workoutslotlogic",
+    "programs.userprofile",
+}
+
+# Per-request routing state: None outside requests (primary only), "replica" while
+# replica reads are allowed, "primary" when pinned up front, "written" after a write
+_routing = ContextVar("programs_db_routing", default=None)
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """
+    Allow replica reads for the enclosed block (a request), or start it pinned to the primary.
+    """
+    token = _routing.set("primary" if pinned else "replica")
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary for the enclosed block even inside a replica-reading request,
+    e.g. while building a snapshot that is stamped with a version read on the primary.
+    """
+    if _routing.get() != "replica":
+        yield
+        return
+    token = _routing.set("primary")
+    try:
+        yield
+    finally:
+        written = wrote()
+        _routing.reset(token)
+        if written:
+            record_write()
+
+
+def record_write():
+    if _routing.get() is not None:
+        _routing.set("written")
+
+
+def wrote():
+    return _routing.get() == "written"
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or _routing.get() != "replica" or model._meta.label_lower not in REPLICA_MODELS:
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # Related lookups stay on the database the instance came from
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Inside a transaction, reads must see its own uncommitted writes
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        record_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so cross-alias relations are the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Real replicas get the schema through replication; this only lets
+        # `migrate --database=<replica>` prepare a local stand-in
+        return None
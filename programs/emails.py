@@ -1,36 +1,128 @@
 # programs/emails.py
 
+import logging
+import os
+import threading
+from functools import lru_cache
+
 import sib_api_v3_sdk
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 from sib_api_v3_sdk.rest import ApiException
 
+from .metrics import registry as metrics
+
+logger = logging.getLogger(__name__)
+
+_api_lock = threading.Lock()
+_api = None  # (pid, api_key, host, TransactionalEmailsApi)
+
+
+def get_brevo_api():
+    """
+    Process-wide TransactionalEmailsApi. Its urllib3 pool keeps HTTP/1.1 connections alive,
+    so consecutive sends reuse the TLS connection instead of opening a new one each time.
+    Rebuilt after a fork or when the key / host settings change.
+    """
+    global _api
+    api_key = settings.BREVO_API_KEY
+    host = settings.BREVO_API_HOST
+    pid = os.getpid()
+
+    current = _api
+    if current is not None and current[:3] == (pid, api_key, host):
+        return current[3]
+
+    with _api_lock:
+        if _api is None or _api[:3] != (pid, api_key, host):
+            configuration = sib_api_v3_sdk.Configuration()
+            configuration.api_key['api-key'] = api_key
+            configuration.host = host
+            configuration.connection_pool_maxsize = settings.BREVO_POOL_MAXSIZE
+            _api = (pid, api_key, host, sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration)))
+        return _api[3]
+
+
+@lru_cache(maxsize=None)
+def _compiled_template(template_name):
+    # get_template() only caches when the cached loader is on (DEBUG=False); this always does
+    return get_template(template_name)
+
+
+def render_email(template_name, context):
+    return _compiled_template(template_name).render(context)
+
+
+def _sender():
+    return {"email": settings.DEFAULT_FROM_EMAIL, "name": "Gym System"}
+
+
 def send_brevo_email(subject, template_name, context, to_email):
-    print(f"DEBUG: Attempting to send email to {to_email}...")
-    
-    html_content = render_to_string(template_name, context)
-    
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = settings.BREVO_API_KEY
-    
-    api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
-    
+    logger.debug("Sending %r to %s", subject, to_email)
+
+    html_content = render_email(template_name, context)
+
     send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
         to=[{"email": to_email}],
-        sender={"email": settings.DEFAULT_FROM_EMAIL, "name": "Gym System"},
+        sender=_sender(),
         subject=subject,
         html_content=html_content,
-    )  
-
-    try:
-        # Puraana: send_trans_email
-        # Naya (Correct): send_transac_email
-        api_instance.send_transac_email(send_smtp_email) 
-        print("DEBUG: Email successfully sent to Brevo API!")
-        return True
-    except ApiException as e:
-        print(f"Brevo API Error: {e}")
-        return False
-    except Exception as e:
-        print(f"General Error: {e}")
-        return False
\ No newline at end of file
+    )
+
+    with metrics.timer("gym_brevo_send_duration_seconds", {"operation": "send"}) as labels:
+        try:
+            get_brevo_api().send_transac_email(send_smtp_email)
+            logger.debug("Brevo accepted %r for %s", subject, to_email)
+            labels["outcome"] = "success"
+            return True
+        except ApiException as e:
+            logger.warning("Brevo API error sending %r to %s: %s", subject, to_email, e)
+            labels["outcome"] = "api_error"
+            return False
+        except Exception:
+            logger.exception("Brevo send failed (%r to %s)", subject, to_email)
+            labels["outcome"] = "error"
+            return False
+
+
+def send_brevo_bulk(subject, template_name, recipients, batch_size=None):
+    """
+    Send one template to many recipients, batching up to `batch_size` of them per API call.
+
+    `recipients` is a list of (to_email, context). The template is rendered once with
+    Brevo `{{ params.<key> }}` placeholders and each recipient becomes a message version
+    carrying its own context as params, so only templates that plainly interpolate
+    context values (like the ones in templates/emails/) are suitable.
+
+    Returns the number of recipients whose batch was accepted.
+    """
+    batch_size = batch_size or settings.BREVO_BULK_BATCH_SIZE
+    keys = sorted({k for _, context in recipients for k in context})
+    html_content = render_email(template_name, {k: "{{ params.%s }}" % k for k in keys})
+
+    accepted = 0
+    logger.info("Sending %r to %d recipients in batches of %d", subject, len(recipients), batch_size)
+    for start in range(0, len(recipients), batch_size):
+        batch = recipients[start:start + batch_size]
+        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+            sender=_sender(),
+            subject=subject,
+            html_content=html_content,
+            message_versions=[
+                {"to": [{"email": to_email}], "params": {k: context.get(k, "") for k in keys}}
+                for to_email, context in batch
+            ],
+        )
+        with metrics.timer("gym_brevo_send_duration_seconds", {"operation": "bulk"}) as labels:
+            try:
+                get_brevo_api().send_transac_email(send_smtp_email)
+                accepted += len(batch)
+                labels["outcome"] = "success"
+            except ApiException:
+                logger.exception("Brevo API error (bulk, %d recipients)", len(batch))
+                labels["outcome"] = "api_error"
+            except Exception:
+                logger.exception("Brevo bulk send failed (%d recipients)", len(batch))
+                labels["outcome"] = "error"
+
+    return accepted
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.services.training_age_bulk import FORMATS, TrainingAgeBulkUpdater, UpdateFormatError, format_for, iter_rows
+
+
+class Command(BaseCommand):
+    help = "Apply a CSV/JSON/NDJSON file of (username, training_age) re-assessments in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read, or - for stdin.")
+        parser.add_argument("--format", choices=FORMATS, help="Input format (default: from the file extension).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Usernames resolved and rows written per batch.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without saving.")
+        parser.add_argument("--show", type=int, default=50, help="How many not-found/invalid rows to list.")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or format_for(options["path"])
+        if fmt is None:
+            raise CommandError("Can't tell the format from the path; pass --format.")
+
+        updater = TrainingAgeBulkUpdater(batch_size=options["batch_size"])
+        stream = sys.stdin.buffer if options["path"] == "-" else None
+        try:
+            if stream is None:
+                with open(options["path"], "rb") as stream:
+                    report = updater.run(iter_rows(stream, fmt), dry_run=options["dry_run"])
+            else:
+                report = updater.run(iter_rows(stream, fmt), dry_run=options["dry_run"])
+        except (UpdateFormatError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        problems = [r for r in report.results if r["status"] in ("not_found", "invalid")]
+        for row in problems[:options["show"]]:
+            self.stderr.write(f"line {row['line']}: {row['username'] or '?'} {row['status']} {row.get('detail', '')}".rstrip())
+
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run: {report.summary()}")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Training ages updated: {report.summary()}"))
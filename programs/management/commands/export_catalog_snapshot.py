@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.services.catalog_file import CatalogFile, CatalogFileError, build_arrays, content_hash, write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Export exercises, prescriptions and slot plans to the mmapped binary catalog snapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Snapshot path (default: CATALOG_SNAPSHOT_PATH).")
+        parser.add_argument(
+            "--if-changed", action="store_true",
+            help="Leave the file alone when its content already matches the DB (workers keep their snapshot).",
+        )
+
+    def handle(self, *args, **options):
+        path = options["output"] or settings.CATALOG_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("No output path: pass --output or set CATALOG_SNAPSHOT_PATH.")
+
+        started = time.monotonic()
+        arrays = build_arrays()
+        counts = ", ".join(f"{len(arrays[name])} {name}" for name in ("exercises", "prescriptions", "slots"))
+
+        if options["if_changed"] and os.path.exists(path):
+            try:
+                unchanged = CatalogFile(path).content_hash == content_hash(arrays)
+            except CatalogFileError:
+                unchanged = False
+            if unchanged:
+                self.stdout.write(f"{path} is up to date ({counts}).")
+                return
+
+        header = write_snapshot(path, arrays)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {path}: {counts}, {len(arrays['string_offsets']) - 1} strings, "
+            f"{os.path.getsize(path)} bytes, hash {header['content_hash']} "
+            f"in {time.monotonic() - started:.2f}s."
+        ))
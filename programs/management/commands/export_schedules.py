@@ -0,0 +1,32 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from programs.services.schedule_export import ScheduleExporter
+
+
+class Command(BaseCommand):
+    help = "Write every member's current bracket, phase and 16-slot plan as NDJSON (constant memory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="File to write, or - for stdout.")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Profiles fetched per DB round trip.")
+
+    def handle(self, *args, **options):
+        exporter = ScheduleExporter(chunk_size=options["chunk_size"])
+        started = time.monotonic()
+        written = 0
+        out = sys.stdout.buffer if options["output"] == "-" else open(options["output"], "wb")
+        try:
+            for chunk in exporter.chunks(gzip=options["gzip"]):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+            else:
+                out.flush()
+
+        self.stderr.write(f"Exported {written} bytes in {time.monotonic() - started:.1f}s.")
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from programs.services.synthetic import SyntheticData
+
+
+class Command(BaseCommand):
+    help = "Generate production-scale synthetic exercises, prescriptions, slot logic and members (batched, flat memory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exercises", type=int, default=50_000)
+        parser.add_argument("--coverage", type=float, default=1.0, help="Share of (exercise, level) pairs with a prescription.")
+        parser.add_argument("--phases", type=int, default=2, help="Slot-logic phases per bracket.")
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--user-offset", type=int, default=0, help="First user number; lets a seed be resumed or extended.")
+        parser.add_argument("--max-months", type=int, default=36, help="Spread training_start_date over this many months.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="syn", help="Prefix for generated names, to keep them apart from real data.")
+        parser.add_argument("--password", default="synthetic-pass")
+        parser.add_argument("--skip-catalog", action="store_true")
+        parser.add_argument("--skip-users", action="store_true")
+
+    def handle(self, *args, **options):
+        data = SyntheticData(
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            prefix=options["prefix"],
+            max_training_months=options["max_months"],
+        )
+        started = time.monotonic()
+
+        if not options["skip_catalog"]:
+            self.stdout.write(f"Creating {options['exercises']} exercises...")
+            data.create_exercises(options["exercises"])
+            self.stdout.write("Creating prescriptions...")
+            created = data.create_prescriptions(coverage=options["coverage"])
+            self.stdout.write(f"  {created} prescriptions")
+            created = data.create_slots(phases=options["phases"])
+            self.stdout.write(f"  {created} workout slots")
+
+        if not options["skip_users"]:
+            total = options["users"]
+            self.stdout.write(f"Creating {total} users with profiles...")
+
+            def progress(done):
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"  {done}/{total} users ({elapsed:.0f}s)")
+
+            data.create_users(total, password=options["password"], start=options["user_offset"], progress=progress)
+
+        self.stdout.write(self.style.SUCCESS(f"Synthetic data generated in {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.services.book_ingest import BookFormatError, BookIngestor, iter_book_chunks
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV/XLSX program book (every bracket and phase) into WorkoutSlotLogic."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to a .csv or .xlsx program book.")
+        parser.add_argument("--sheet", help="Worksheet name for .xlsx files (default: active sheet).")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows read and written per chunk.")
+        parser.add_argument("--prune", action="store_true", help="Delete stored slots that are not in the file.")
+        parser.add_argument("--dry-run", action="store_true", help="Report the diff without writing anything.")
+        parser.add_argument("--show", type=int, default=50, help="How many changes/errors to list in the report.")
+
+    def handle(self, *args, **options):
+        ingestor = BookIngestor(sample_size=options["show"])
+        try:
+            chunks = iter_book_chunks(options["path"], options["chunk_size"], options["sheet"])
+            report = ingestor.run(chunks, dry_run=options["dry_run"], prune=options["prune"])
+        except (BookFormatError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        for line in report.changes:
+            self.stdout.write(line)
+        for line in report.errors:
+            self.stderr.write(line)
+
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run: {report.summary()}")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Program book ingested: {report.summary()}"))
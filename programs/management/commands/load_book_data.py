@@ -1,14 +1,13 @@
 from django.core.management.base import BaseCommand
-from django.utils.text import slugify
-from programs.models import Exercise, WorkoutSlotLogic
+from programs.services.book_loader import SlotLogicLoader
 
 class Command(BaseCommand):
     help = "Load gym exercise logic (16 slots) directly from the book data."
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write("Cleaning old logic data...")
-        WorkoutSlotLogic.objects.all().delete() # Fresh start for slots
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change.")
 
+    def handle(self, *args, **options):
         # 0-1 AGE TRAINING LOGIC (As per your Excel sheet)
         # Phase 1: Months 1-4
         phase_1_0_1 = [
@@ -38,27 +37,24 @@ class Command(BaseCommand):
 
         self.stdout.write("Loading 16 Exercise Slots with Options...")
 
-        for bracket, start, end, slots in brackets:
-            for s in slots:
-                # Create Exercise Objects first to maintain consistency
-                slug = slugify(s["base"])
-                Exercise.objects.get_or_create(
-                    slug=slug,
-                    defaults={"name": s["base"], "category": s["pattern"], "kind": s["pattern"]}
-                )
+        rows = [
+            {
+                "training_bracket": bracket,
+                "phase": start,  # 'month_range_start' ki jagah 'phase' use karein
+                "slot_number": s["slot"],
+                "movement_pattern": s["pattern"],
+                "base_exercise": s["base"],
+                "progression_exercise": s["easy"],
+                "regression_exercise": s["hard"],
+            }
+            for bracket, start, end, slots in brackets
+            for s in slots
+        ]
 
-                # Save the logic to the new model
-                WorkoutSlotLogic.objects.update_or_create(
-                    training_bracket=bracket,
-                    phase=start,  # 'month_range_start' ki jagah 'phase' use karein
-                    slot_number=s["slot"],
-                    defaults={
-                        # 'month_range_end' ko hata dein kyunki aapke model mein nahi hai
-                        "movement_pattern": s["pattern"], # Model mein jo naam hai wahi yahan likhein
-                        "base_exercise": s["base"],
-                        "progression_exercise": s["easy"],
-                        "regression_exercise": s["hard"],
-                    }
-                )
+        # Diff against the stored rows and apply it in one transaction (no delete-all window)
+        result = SlotLogicLoader().load(rows, dry_run=options["dry_run"])
 
-        self.stdout.write(self.style.SUCCESS("Master gym logic loaded successfully."))
\ No newline at end of file
+        if options["dry_run"]:
+            self.stdout.write(f"Dry run: {result.summary()}")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Master gym logic loaded successfully ({result.summary()})."))
@@ -0,0 +1,43 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from programs.models import UserProfile
+from programs.services.training_state import TrainingStateRefresher
+
+
+class Command(BaseCommand):
+    help = "Recompute materialized training month/level/bracket/phase for profiles whose month boundary has passed (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--date", type=date.fromisoformat, help="Recompute as of this day (YYYY-MM-DD); default today.")
+        parser.add_argument("--summary", action="store_true", help="Print members per bracket/phase and who enters phase 2 this week.")
+
+    def handle(self, *args, **options):
+        today = options["date"] or timezone.now().date()
+        started = time.monotonic()
+
+        def progress(scanned, updated):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {scanned} scanned, {updated} updated ({time.monotonic() - started:.0f}s)")
+
+        scanned, updated = TrainingStateRefresher(batch_size=options["batch_size"]).refresh(today, progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Training state refreshed: {scanned} scanned, {updated} updated in {time.monotonic() - started:.1f}s."
+        ))
+
+        if options["summary"]:
+            rows = (
+                UserProfile.objects.values("training_bracket", "training_phase")
+                .annotate(members=Count("id"))
+                .order_by("training_bracket", "training_phase")
+            )
+            for row in rows:
+                self.stdout.write(f"  {row['training_bracket']:>4} phase {row['training_phase']}: {row['members']}")
+            week_end = today + timedelta(days=7 - today.weekday())
+            entering = UserProfile.objects.entering_phase(2, today, week_end).count()
+            self.stdout.write(f"  entering phase 2 by the end of this week: {entering}")
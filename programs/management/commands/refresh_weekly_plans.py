@@ -0,0 +1,40 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from programs.services.weekly_plans import WeeklyPlanService
+
+
+class Command(BaseCommand):
+    help = "Regenerate stored weekly plans for members queued as dirty (training age, phase or catalog changes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--date", type=date.fromisoformat, help="Build plans for the week of this day (YYYY-MM-DD); default today.")
+        parser.add_argument("--fill", action="store_true", help="Also build this week's plan for every member who has none yet.")
+        parser.add_argument("--keep-weeks", type=int, default=4, help="Delete plans older than this many weeks.")
+
+    def handle(self, *args, **options):
+        service = WeeklyPlanService(batch_size=options["batch_size"])
+        day = options["date"]
+        started = time.monotonic()
+
+        def progress(written):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {written} plans written ({time.monotonic() - started:.0f}s)")
+
+        queued = service.mark_stale_levels(day)
+        self.stdout.write(f"Queued {queued} members whose level's catalog changed.")
+
+        written = service.refresh_dirty(day, progress)
+        self.stdout.write(f"Rebuilt {written} dirty plans.")
+
+        if options["fill"]:
+            filled = service.fill_week(day, progress)
+            self.stdout.write(f"Built {filled} missing plans.")
+
+        pruned = service.prune(options["keep_weeks"], day)
+        self.stdout.write(self.style.SUCCESS(
+            f"Weekly plans refreshed in {time.monotonic() - started:.1f}s ({pruned} old plans deleted)."
+        ))
@@ -0,0 +1,178 @@
+import platform
+
+import django
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from programs.benchmarks import BenchCase, BenchmarkRunner, compare, format_table, read_baseline, write_baseline
+from programs.models import Exercise, UserProfile
+from programs.services.age_logic import AgeLogic
+from programs.services.bulk_scheduler import BulkScheduler
+from programs.services.recommender import WorkoutService
+from programs.services.scheduler import SchedulerService
+from programs.services.synthetic import CATEGORIES, SyntheticData
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the services layer and every API view against a synthetic catalog in a throwaway test DB."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exercises", type=int, default=300)
+        parser.add_argument("--coverage", type=float, default=1.0, help="Share of (exercise, level) pairs with a prescription.")
+        parser.add_argument("--phases", type=int, default=2, help="Slot-logic phases per bracket.")
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--auth-iterations", type=int, default=10, help="Iterations for views that hash passwords.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--only", help="Run only cases whose name contains this text.")
+        parser.add_argument("--fast-hashers", action="store_true", help="Use MD5 hashing so auth views measure everything but PBKDF2.")
+        parser.add_argument("--output", help="Write results as a JSON baseline to this path.")
+        parser.add_argument("--baseline", help="Compare against this JSON baseline.")
+        parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown before a case counts as regressed.")
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            hashers = FAST_HASHERS if options["fast_hashers"] else None
+            with override_settings(**({"PASSWORD_HASHERS": hashers} if hashers else {})):
+                results = self.run_all(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for line in format_table(results):
+            self.stdout.write(line)
+
+        meta = {
+            "exercises": options["exercises"],
+            "coverage": options["coverage"],
+            "phases": options["phases"],
+            "users": options["users"],
+            "seed": options["seed"],
+            "fast_hashers": options["fast_hashers"],
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+        }
+        if options["output"]:
+            write_baseline(options["output"], meta, results)
+            self.stdout.write(f"Baseline written to {options['output']}")
+
+        if options["baseline"]:
+            baseline = read_baseline(options["baseline"])
+            if options["only"]:
+                baseline = {k: v for k, v in baseline.items() if options["only"] in k}
+            lines, regressed = compare(results, baseline, options["threshold"])
+            for line in lines:
+                self.stdout.write(line)
+            if regressed and options["fail_on_regression"]:
+                raise CommandError("Benchmark regression against baseline.")
+
+    def seed(self, options):
+        data = SyntheticData(seed=options["seed"])
+        data.create_exercises(options["exercises"])
+        data.create_prescriptions(coverage=options["coverage"])
+        data.create_slots(phases=options["phases"])
+        data.create_users(options["users"])
+
+        admin = User.objects.create_user("bench_admin", "admin@example.com", "bench-pass", is_staff=True)
+        member = User.objects.create_user("bench_member", "member@example.com", "bench-pass")
+        profile = member.profile
+        profile.training_age, profile.is_verified = 3, True
+        profile.save()
+        return admin, member
+
+    def cases(self, options, admin, member):
+        age_logic = AgeLogic()
+        workouts = WorkoutService()
+        scheduler = SchedulerService()
+        bulk = BulkScheduler()
+        exercise_id = Exercise.objects.order_by("id").values_list("id", flat=True).first()
+        categories = CATEGORIES
+        auth_iters = options["auth_iterations"]
+
+        def client_for(user):
+            client = APIClient()
+            if user is not None:
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+            return client
+
+        anon, member_client, admin_client = client_for(None), client_for(member), client_for(admin)
+        uid = urlsafe_base64_encode(force_bytes(member.pk))
+        counter = iter(range(10 ** 9))
+
+        def set_otp():
+            UserProfile.objects.filter(user=member).update(otp="123456")
+
+        def fresh_token():
+            member.refresh_from_db()
+            return default_token_generator.make_token(member)
+
+        return [
+            # services
+            BenchCase("service.age_logic.get_level", lambda _: age_logic.get_level(3)),
+            BenchCase("service.workout.get_exercise_plan", lambda _: workouts.get_exercise_plan(exercise_id, 7)),
+            BenchCase("service.workout.daily_workout", lambda _: workouts.daily_workout(categories, 3)),
+            BenchCase("service.workout.daily_workouts_x50", lambda _: workouts.daily_workouts([(categories, 3)] * 50)),
+            BenchCase("service.scheduler.get_candidates", lambda _: scheduler.get_candidates_for_level(3)),
+            BenchCase("service.scheduler.build_4_day_plan", lambda _: scheduler.build_4_day_plan(3)),
+            BenchCase("service.scheduler.seeded_4_day_plan", lambda _: scheduler.seeded_4_day_plan(member.pk, 3)),
+            BenchCase("service.bulk_scheduler.1000_users", lambda _: bulk.plan_indices(range(1000), seed=1)),
+            # views
+            BenchCase("view.options", lambda _: member_client.get(f"/api/options/{categories[0]}/")),
+            BenchCase("view.exercise_detail", lambda _: member_client.post(
+                "/api/exercise-detail/", {"exercise_id": exercise_id, "training_age": 7}, format="json")),
+            BenchCase("view.full_workout", lambda _: member_client.post(
+                "/api/full-workout/", {"categories": categories, "training_age": 3}, format="json")),
+            BenchCase("view.full_workout_batch_x50", lambda _: member_client.post(
+                "/api/full-workout/batch/",
+                {"requests": [{"categories": categories, "training_age": 3}] * 50}, format="json")),
+            BenchCase("view.all_categories", lambda _: anon.get("/api/all-categories/")),
+            BenchCase("view.my_schedule", lambda _: member_client.get("/api/my-schedule/")),
+            BenchCase("view.my_options", lambda _: member_client.get("/api/my-options/")),
+            BenchCase("view.admin_update_training_age", lambda _: admin_client.patch(
+                "/api/admin/update-training-age/bench_member/", {"training_age": 3}, format="json")),
+            BenchCase("view.signup", lambda n: anon.post(
+                "/api/signup/", {"username": f"bench_signup_{n}", "password": "bench-pass-123",
+                                 "email": f"bench_signup_{n}@example.com"}, format="json"),
+                prepare=lambda: next(counter), iterations=auth_iters),
+            BenchCase("view.login", lambda _: anon.post(
+                "/api/login/", {"username": "bench_member", "password": "bench-pass"}, format="json"),
+                iterations=auth_iters),
+            BenchCase("view.verify_email", lambda token: anon.get(f"/api/verify-email/{uid}/{token}/"),
+                      prepare=fresh_token),
+            BenchCase("view.forget_password", lambda _: anon.post(
+                "/api/forget-password/", {"email": "member@example.com"}, format="json")),
+            BenchCase("view.verify_reset_link", lambda token: anon.get(f"/api/verify-reset-link/{uid}/{token}/"),
+                      prepare=fresh_token),
+            BenchCase("view.reset_password_final", lambda _: anon.post(
+                f"/api/reset-password-final/{uid}/x/", {"otp": "123456", "password": "bench-pass"}, format="json"),
+                prepare=set_otp, iterations=auth_iters),
+            BenchCase("view.reset_password_confirm", lambda token: anon.post(
+                f"/api/reset-password-confirm/{uid}/{token}/", {"password": "bench-pass"}, format="json"),
+                prepare=fresh_token, iterations=auth_iters),
+        ]
+
+    def run_all(self, options):
+        self.stdout.write("Seeding synthetic catalog...")
+        admin, member = self.seed(options)
+
+        runner = BenchmarkRunner(iterations=options["iterations"])
+        for case in self.cases(options, admin, member):
+            if options["only"] and options["only"] not in case.name:
+                continue
+            runner.run(case)
+        return runner.results
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from programs.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued EmailOutbox rows concurrently, with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8, help="Parallel provider calls.")
+        parser.add_argument("--batch-size", type=int, default=50, help="Rows claimed per round.")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument("--once", action="store_true", help="Drain what is due now and exit.")
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(concurrency=options["concurrency"], batch_size=options["batch_size"])
+        self.stdout.write(f"Outbox worker started ({worker.transport.__class__.__name__}, concurrency={worker.concurrency}).")
+
+        try:
+            while True:
+                sent, retried, failed = worker.run_once()
+                if sent or retried or failed:
+                    self.stdout.write(f"sent={sent} retried={retried} failed={failed}")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.shutdown()
+
+        self.stdout.write(self.style.SUCCESS("Outbox worker stopped."))
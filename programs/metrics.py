@@ -0,0 +1,225 @@
+# programs/metrics.py
+#
+# Tiny Prometheus-style metrics registry. Each process keeps counters/histograms in
+# memory; when METRICS_DIR is set it also dumps them to METRICS_DIR/metrics-<pid>.json
+# every METRICS_FLUSH_INTERVAL seconds so /api/metrics can add up all gunicorn workers
+# (files left by workers that have exited are dropped).
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger(__name__)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "gym_http_requests_total": ("counter", "HTTP requests by view, method and status.", None),
+    "gym_http_request_duration_seconds": ("histogram", "Request latency by view.", LATENCY_BUCKETS),
+    "gym_http_response_size_bytes": ("histogram", "Response body size by view.", SIZE_BUCKETS),
+    "gym_http_db_queries": ("histogram", "DB queries per request by view.", QUERY_BUCKETS),
+    "gym_http_db_query_duration_seconds_total": ("counter", "Time spent in DB queries by view.", None),
+    "gym_brevo_send_duration_seconds": ("histogram", "Brevo API call latency by operation and outcome.", LATENCY_BUCKETS),
+    "gym_cache_requests_total": ("counter", "Tiered cache lookups by cache and result (local_hit, shared_hit, wait_hit, miss).", None),
+    "gym_cache_build_duration_seconds": ("histogram", "Time spent computing tiered cache misses by cache.", LATENCY_BUCKETS),
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._flush_lock = threading.Lock()  # one flush at a time per process
+        self._last_flush = 0.0
+
+    def inc(self, name, labels, amount=1.0):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(buckets) + 2)
+            idx = bisect_left(buckets, value)
+            if idx < len(buckets):
+                h[idx] += 1
+            h[-2] += value
+            h[-1] += 1
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name, labels):
+        """
+        Observe the block's duration; adds outcome="error" if it raises and no outcome is set.
+        """
+        start = time.perf_counter()
+        try:
+            yield labels
+        except Exception:
+            labels.setdefault("outcome", "error")
+            raise
+        finally:
+            self.observe(name, labels, time.perf_counter() - start)
+
+    def state(self):
+        with self._lock:
+            return {
+                "counters": [[n, list(map(list, l)), v] for (n, l), v in self._counters.items()],
+                "histograms": [[n, list(map(list, l)), h[:]] for (n, l), h in self._histograms.items()],
+            }
+
+    # --- multi-process ---
+
+    def _maybe_flush(self):
+        directory = getattr(settings, "METRICS_DIR", "")
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+        if not directory or time.monotonic() - self._last_flush < interval:
+            return
+        # Whoever gets the lock flushes; other threads carry on with their request
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if now - self._last_flush >= interval:
+                self._last_flush = now
+                self._write(directory)
+        finally:
+            self._flush_lock.release()
+
+    def flush(self, directory=None):
+        directory = directory or getattr(settings, "METRICS_DIR", "")
+        if not directory:
+            return
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            self._write(directory)
+
+    def _write(self, directory):
+        # Metrics must never fail the request that happened to trigger the flush
+        try:
+            path = Path(directory)
+            path.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path, prefix=".metrics-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(self.state(), f)
+                os.replace(tmp, path / f"metrics-{os.getpid()}.json")
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        except Exception:
+            logger.exception("Could not flush metrics to %s", directory)
+
+    def collect(self):
+        """
+        This process's live state plus every other process's last flush, summed.
+        """
+        states = [self.state()]
+        directory = getattr(settings, "METRICS_DIR", "")
+        if directory and os.path.isdir(directory):
+            own = f"metrics-{os.getpid()}.json"
+            for f in Path(directory).glob("metrics-*.json"):
+                if f.name == own:
+                    continue
+                if not _alive(f.stem.removeprefix("metrics-")):
+                    # A worker that has exited (restart, max_requests): stop counting it
+                    try:
+                        f.unlink(missing_ok=True)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    states.append(json.loads(f.read_text()))
+                except (OSError, ValueError):
+                    continue
+
+        counters, histograms = {}, {}
+        for state in states:
+            for name, labels, value in state["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, values in state["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                current = histograms.get(key)
+                histograms[key] = values[:] if current is None else [a + b for a, b in zip(current, values)]
+        return counters, histograms
+
+    def render(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (n, labels), value in sorted(counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{_labels(labels)} {_num(value)}")
+            else:
+                for (n, labels), h in sorted(histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets, h):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', _num(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h[-1]}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_num(h[-2])}")
+                    lines.append(f"{name}_count{_labels(labels)} {h[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def _alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+registry = Registry()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        registry.flush()
+    except Exception:
+        pass
@@ -0,0 +1,211 @@
+# programs/middleware.py
+
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .db_router import replica_aliases, replica_reads, wrote
+from .metrics import registry
+from .profiling import profile_request
+
+
+def view_label(request):
+    """
+    View class name for metrics (e.g. "UserScheduleAPI"); "unmatched" for 404s that
+    never resolved, so random URLs can't blow up label cardinality.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    func = match.func
+    view_class = getattr(func, "view_class", None) or getattr(func, "cls", None)
+    return getattr(view_class, "__name__", None) or getattr(func, "__name__", "unknown")
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB query count/time, response size and status for every request.
+    Exposed by MetricsAPI (/api/metrics/) in Prometheus format.
+
+    Under ASGI the async views' ORM calls run in executor threads, out of reach of the
+    execute_wrapper, so async requests record everything except the DB query metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not getattr(settings, "METRICS_ENABLED", True):
+            return self.get_response(request)
+
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(queries))
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, None)
+        return response
+
+    @staticmethod
+    def record(request, response, duration, queries):
+        view = view_label(request)
+        registry.inc("gym_http_requests_total", {"view": view, "method": request.method, "status": str(response.status_code)})
+        registry.observe("gym_http_request_duration_seconds", {"view": view, "method": request.method}, duration)
+        if queries is not None:
+            registry.observe("gym_http_db_queries", {"view": view}, queries.count)
+            registry.inc("gym_http_db_query_duration_seconds_total", {"view": view}, queries.duration)
+        if not response.streaming:
+            registry.observe("gym_http_response_size_bytes", {"view": view}, len(response.content))
+
+
+class ProfilingMiddleware:
+    """
+    Runs the request under cProfile and saves the profile plus its SQL to PROFILING_DIR
+    (see programs/profiling.py) when either:
+      - a staff user sends `X-Profile: 1` or `?profile=1` (session or JWT auth), or
+      - the request falls inside PROFILING_SAMPLE_RATE (0..1, default 0 = off).
+    The capture name comes back in the X-Profile-Id response header.
+
+    Under ASGI a profiled request is run from a worker thread through async_to_sync, so
+    sync views (and their SQL) execute in the profiled thread; async views' own code and
+    ORM calls only partly show up. Unprofiled requests stay on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            return self.get_response(request)
+
+        reason = self.reason(request)
+        if reason is None:
+            return self.get_response(request)
+        return profile_request(self.get_response, request, view_label, reason)
+
+    async def __acall__(self, request):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            return await self.get_response(request)
+
+        # staff check may hit the DB, so it runs in a thread (only when a profile was asked for)
+        reason = await sync_to_async(self.reason)(request) if self.requested(request) else self.sample()
+        if reason is None:
+            return await self.get_response(request)
+        return await sync_to_async(profile_request)(async_to_sync(self.get_response), request, view_label, reason)
+
+    def reason(self, request):
+        if self.requested(request) and self.is_staff(request):
+            return "requested"
+        return self.sample()
+
+    @staticmethod
+    def sample():
+        return "sampled" if random.random() < getattr(settings, "PROFILING_SAMPLE_RATE", 0.0) else None
+
+    @staticmethod
+    def requested(request):
+        return request.headers.get("X-Profile") == "1" or request.GET.get("profile") == "1"
+
+    @staticmethod
+    def is_staff(request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return bool(result and result[0].is_staff)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Lets a request's catalog/profile reads go to the replicas (see programs.db_router).
+    Unsafe methods and clients holding the sticky cookie stay on the primary; a request
+    that wrote sets the cookie so the client reads its own writes for the next
+    REPLICA_STICKY_SECONDS, i.e. until the replicas have caught up.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+        with replica_reads(pinned=self.pinned(request)):
+            response = self.get_response(request)
+            self.stick(response)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        # sync_to_async copies context changes back, so writes made in ORM threads count
+        with replica_reads(pinned=self.pinned(request)):
+            response = await self.get_response(request)
+            self.stick(response)
+        return response
+
+    @staticmethod
+    def pinned(request):
+        return request.method not in ("GET", "HEAD", "OPTIONS") or settings.REPLICA_STICKY_COOKIE in request.COOKIES
+
+    @staticmethod
+    def stick(response):
+        if wrote():
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, "1",
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite="Lax",
+            )
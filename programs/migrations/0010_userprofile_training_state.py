@@ -0,0 +1,44 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0009_emailoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='training_bracket',
+            field=models.CharField(default='0-1', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='training_level',
+            field=models.CharField(choices=[('baby', '0-1'), ('kid', '2-4'), ('adult', '5+')], db_index=True, default='baby', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='training_month',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='training_phase',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='training_state_until',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['training_bracket', 'training_phase'], name='profile_bracket_phase_idx'),
+        ),
+    ]
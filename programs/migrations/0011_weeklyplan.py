@@ -0,0 +1,46 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('programs', '0010_userprofile_training_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyPlanDirty',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('reason', models.CharField(choices=[('training_age', 'Training age changed'), ('phase', 'Phase rolled over'), ('catalog', 'Catalog changed')], max_length=20)),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WeeklyPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('training_age', models.IntegerField()),
+                ('level', models.CharField(choices=[('baby', '0-1'), ('kid', '2-4'), ('adult', '5+')], max_length=10)),
+                ('training_bracket', models.CharField(max_length=10)),
+                ('phase', models.IntegerField()),
+                ('training_month', models.IntegerField()),
+                ('level_fingerprint', models.CharField(max_length=16)),
+                ('days', models.JSONField()),
+                ('generated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_plans', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week_start', 'level'], name='programs_we_week_st_df60f3_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'week_start'), name='unique_weekly_plan')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0011_weeklyplan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotVersion',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
+from datetime import datetime, timedelta
+from .services.age_logic import AgeLogic
 # load_book_data.py ki line 3
 
 
@@ -50,6 +52,60 @@ class Prescription(models.Model):
         return f"{self.exercise.name} ({self.level})"
 
 
+def training_month(training_start_date, today=None):
+    """
+    1-based month of training on `today` (default: now), e.g. 1 in the first month.
+    """
+    delta = relativedelta(today or timezone.now().date(), training_start_date)
+    return (delta.years * 12) + delta.months + 1
+
+
+def training_state(training_age, training_start_date, today=None):
+    """
+    Derived training fields as stored on UserProfile. `training_state_until` is the day the
+    next training month starts, i.e. when these values next need recomputing.
+    """
+    today = today or timezone.now().date()
+    if isinstance(training_start_date, datetime):
+        # unsaved profiles still hold the timezone.now default
+        training_start_date = timezone.localtime(training_start_date).date()
+    age_logic = AgeLogic()
+    month = training_month(training_start_date, today)
+    until = training_start_date + relativedelta(months=month)
+    if until <= today:
+        # relativedelta clips month ends (Jan 31 + 1 month = Feb 28); never hand out a past date
+        until = today + timedelta(days=1)
+    return {
+        "training_month": month,
+        "training_level": age_logic.get_level(training_age),
+        "training_bracket": age_logic.get_bracket(training_age),
+        "training_phase": age_logic.get_phase(month),
+        "training_state_until": until,
+    }
+
+
+TRAINING_STATE_FIELDS = ("training_month", "training_level", "training_bracket", "training_phase", "training_state_until")
+
+
+class UserProfileQuerySet(models.QuerySet):
+    def stale_training_state(self, today=None):
+        today = today or timezone.now().date()
+        return self.filter(models.Q(training_state_until__lte=today) | models.Q(training_state_until__isnull=True))
+
+    def entering_phase(self, phase, start, end):
+        """
+        Profiles that are still to reach `phase` and will do so on a day in [start, end),
+        e.g. the rest of this week. Relies on the materialized state being current
+        (refresh_training_state runs nightly).
+        """
+        return self.filter(
+            training_phase=phase - 1,
+            training_month=AgeLogic().phase_start_month(phase) - 1,
+            training_state_until__gte=start,
+            training_state_until__lt=end,
+        )
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     training_start_date = models.DateField(default=timezone.now)
@@ -59,11 +115,55 @@ class UserProfile(models.Model):
     is_verified = models.BooleanField(default=False)
     otp = models.CharField(max_length=6, null=True, blank=True)
 
+    # Materialized from training_age / training_start_date (see training_state); kept current
+    # by save() and the nightly refresh_training_state command
+    training_month = models.IntegerField(default=1)
+    training_level = models.CharField(max_length=10, choices=Prescription.LEVEL_CHOICES, default="baby", db_index=True)
+    training_bracket = models.CharField(max_length=10, default="0-1")
+    training_phase = models.IntegerField(default=1)
+    training_state_until = models.DateField(null=True, blank=True, db_index=True)
+
+    objects = UserProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["training_bracket", "training_phase"], name="profile_bracket_phase_idx"),
+        ]
+
     @property
     def current_training_month(self):
         # Aaj ki date aur join date ka farq nikaal kar month calculate karna
-        delta = relativedelta(timezone.now().date(), self.training_start_date)
-        return (delta.years * 12) + delta.months + 1
+        return self.current_training_state()[0]
+
+    def current_training_state(self, today=None):
+        """
+        (month, bracket, phase) for today: the stored columns while they're current,
+        otherwise recomputed in memory (nothing is written).
+        """
+        today = today or timezone.now().date()
+        if self.training_state_until and self.training_state_until > today:
+            return self.training_month, self.training_bracket, self.training_phase
+        state = training_state(self.training_age, self.training_start_date, today)
+        return state["training_month"], state["training_bracket"], state["training_phase"]
+
+    def refresh_training_state(self, today=None):
+        """
+        Recompute the materialized fields; returns True if any of them changed.
+        """
+        changed = False
+        for field, value in training_state(self.training_age, self.training_start_date, today).items():
+            if getattr(self, field) != value:
+                setattr(self, field, value)
+                changed = True
+        return changed
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"training_age", "training_start_date"} & set(update_fields):
+            self.refresh_training_state()
+            if update_fields is not None:
+                kwargs["update_fields"] = set(update_fields) | set(TRAINING_STATE_FIELDS)
+        super().save(*args, **kwargs)
 
 # programs/models.py mein
 class WorkoutSlotLogic(models.Model):
@@ -76,4 +176,111 @@ class WorkoutSlotLogic(models.Model):
     regression_exercise = models.TextField(null=True, blank=True)  # regression_exercise (as per script)
 
     class Meta:
-        unique_together = ('training_bracket', 'phase', 'slot_number')
\ No newline at end of file
+        unique_together = ('training_bracket', 'phase', 'slot_number')
+
+class EmailOutbox(models.Model):
+    """
+    Transactional emails waiting to be delivered by the send_outbox_emails worker.
+    Views only INSERT here; the worker does the (slow) provider round-trip.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    template_name = models.CharField(max_length=200)
+    context = models.JSONField(default=dict)
+    to_email = models.EmailField()
+    dedupe_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+        constraints = [
+            # Identical email already queued / in flight -> don't queue it twice
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status__in=["pending", "sending"]),
+                name="unique_active_outbox_email",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.template_name} -> {self.to_email} ({self.status})"
+
+
+class WeeklyPlan(models.Model):
+    """
+    A member's generated 4-day plan for one ISO week (week_start is the Monday).
+    The slot plan is referenced by (training_bracket, phase) rather than copied.
+    A row is valid while its training_age, level, bracket, phase and level_fingerprint still match;
+    WeeklyPlanService regenerates it otherwise.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="weekly_plans")
+    week_start = models.DateField()
+    training_age = models.IntegerField()
+    level = models.CharField(max_length=10, choices=Prescription.LEVEL_CHOICES)
+    training_bracket = models.CharField(max_length=10)
+    phase = models.IntegerField()
+    training_month = models.IntegerField()
+    level_fingerprint = models.CharField(max_length=16)
+    days = models.JSONField()
+    generated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "week_start"], name="unique_weekly_plan"),
+        ]
+        indexes = [models.Index(fields=["week_start", "level"])]
+
+    def __str__(self):
+        return f"{self.user_id} week of {self.week_start}"
+
+
+class WeeklyPlanDirty(models.Model):
+    """
+    Members whose current WeeklyPlan needs regenerating. One row per user (the user is
+    the primary key), so marking an already-queued user is a no-op.
+    """
+    REASON_TRAINING_AGE = "training_age"
+    REASON_PHASE = "phase"
+    REASON_CATALOG = "catalog"
+    REASON_CHOICES = [
+        (REASON_TRAINING_AGE, "Training age changed"),
+        (REASON_PHASE, "Phase rolled over"),
+        (REASON_CATALOG, "Catalog changed"),
+    ]
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="+")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    marked_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} ({self.reason})"
+
+
+class SnapshotVersion(models.Model):
+    """
+    Version counter for an in-memory snapshot (catalog, slot plans). Kept in the DB so
+    every process (web workers, management commands) sees the same value; each process
+    rebuilds its snapshot when the row moves. See programs/services/catalog.py.
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.key}={self.version}"
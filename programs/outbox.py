@@ -0,0 +1,216 @@
+# programs/outbox.py
+#
+# Persistent email outbox: views call enqueue_email() (a single INSERT) and the
+# send_outbox_emails management command drains the table with a thread pool.
+
+import hashlib
+import json
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import EmailOutbox
+
+ACTIVE_STATUSES = [EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING]
+
+
+class EmailDeliveryError(Exception):
+    pass
+
+
+def make_dedupe_key(subject, template_name, context, to_email):
+    payload = json.dumps([subject, template_name, context, to_email], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def enqueue_email(subject, template_name, context, to_email):
+    """
+    Queue an email for the outbox worker. An identical email that is still pending or
+    in flight is not queued again; the existing row is returned instead.
+    """
+    key = make_dedupe_key(subject, template_name, context, to_email)
+    try:
+        with transaction.atomic():
+            return EmailOutbox.objects.create(
+                subject=subject,
+                template_name=template_name,
+                context=context,
+                to_email=to_email,
+                dedupe_key=key,
+            )
+    except IntegrityError:
+        return EmailOutbox.objects.filter(dedupe_key=key, status__in=ACTIVE_STATUSES).first()
+
+
+async def aenqueue_email(subject, template_name, context, to_email):
+    """
+    enqueue_email() for async views, on the async ORM. Runs in autocommit (the async
+    ORM has no atomic()), so a duplicate simply fails its INSERT.
+    """
+    key = make_dedupe_key(subject, template_name, context, to_email)
+    try:
+        return await EmailOutbox.objects.acreate(
+            subject=subject,
+            template_name=template_name,
+            context=context,
+            to_email=to_email,
+            dedupe_key=key,
+        )
+    except IntegrityError:
+        return await EmailOutbox.objects.filter(dedupe_key=key, status__in=ACTIVE_STATUSES).afirst()
+
+
+# --- TRANSPORTS ---
+# A transport has send(message) where message is an EmailOutbox row; it returns on
+# success and raises EmailDeliveryError (or anything else) on failure.
+
+class BrevoTransport:
+    def send(self, message):
+        from .emails import send_brevo_email
+
+        if not send_brevo_email(message.subject, message.template_name, message.context, message.to_email):
+            raise EmailDeliveryError("Brevo did not accept the email")
+
+
+class FileTransport:
+    """
+    Writes each email as JSON (with rendered HTML) into EMAIL_OUTBOX_FILE_PATH. For local dev.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or getattr(settings, "EMAIL_OUTBOX_FILE_PATH", "sent_emails"))
+
+    def send(self, message):
+        self.path.mkdir(parents=True, exist_ok=True)
+        data = {
+            "id": message.pk,
+            "to": message.to_email,
+            "subject": message.subject,
+            "template": message.template_name,
+            "context": message.context,
+            "html": render_to_string(message.template_name, message.context),
+        }
+        (self.path / f"{message.pk}-{uuid.uuid4().hex[:8]}.json").write_text(json.dumps(data, indent=2))
+
+
+class MemoryTransport:
+    """
+    Keeps sent emails in MemoryTransport.outbox (like django.core.mail.outbox). For tests.
+    """
+    outbox = []
+
+    def send(self, message):
+        MemoryTransport.outbox.append({
+            "to": message.to_email,
+            "subject": message.subject,
+            "template": message.template_name,
+            "context": message.context,
+        })
+
+
+def get_transport():
+    path = getattr(settings, "EMAIL_OUTBOX_TRANSPORT", "programs.outbox.BrevoTransport")
+    return import_string(path)()
+
+
+# --- WORKER ---
+
+class OutboxWorker:
+    """
+    Claims due rows in batches and sends them concurrently through the transport.
+
+    Rows are claimed with a conditional UPDATE, so several worker processes can run side
+    by side. A row stuck in "sending" longer than lease_seconds (worker died) is re-claimed.
+    """
+
+    def __init__(self, transport=None, concurrency=8, batch_size=50, max_attempts=None,
+                 backoff_base=30, backoff_max=3600, lease_seconds=300):
+        self.transport = transport or get_transport()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts or getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="outbox")
+
+    def claim(self):
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        due = EmailOutbox.objects.filter(
+            status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=now
+        ) | EmailOutbox.objects.filter(
+            status=EmailOutbox.STATUS_SENDING, claimed_at__lt=now - timedelta(seconds=self.lease_seconds)
+        )
+        ids = list(due.order_by("next_attempt_at").values_list("id", flat=True)[:self.batch_size])
+        if not ids:
+            return []
+
+        # Only rows nobody else claimed in the meantime are updated
+        EmailOutbox.objects.filter(id__in=ids, status=EmailOutbox.STATUS_PENDING, claimed_by=None).update(
+            status=EmailOutbox.STATUS_SENDING, claimed_by=token, claimed_at=now
+        )
+        EmailOutbox.objects.filter(
+            id__in=ids, status=EmailOutbox.STATUS_SENDING, claimed_at__lt=now - timedelta(seconds=self.lease_seconds)
+        ).update(claimed_by=token, claimed_at=now)
+        return list(EmailOutbox.objects.filter(claimed_by=token))
+
+    def backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def _send(self, message):
+        try:
+            self.transport.send(message)
+            return None
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+
+    def run_once(self):
+        """
+        Send one claimed batch. Returns (sent, retried, failed) counts.
+        """
+        messages = self.claim()
+        if not messages:
+            return 0, 0, 0
+
+        # Only the provider calls run in threads; all DB writes happen here
+        errors = list(self.executor.map(self._send, messages))
+
+        sent = retried = failed = 0
+        now = timezone.now()
+        for message, error in zip(messages, errors):
+            message.attempts += 1
+            message.claimed_by = None
+            message.claimed_at = None
+            if error is None:
+                message.status = EmailOutbox.STATUS_SENT
+                message.sent_at = now
+                message.last_error = ""
+                sent += 1
+            elif message.attempts >= self.max_attempts:
+                message.status = EmailOutbox.STATUS_FAILED
+                message.last_error = error
+                failed += 1
+            else:
+                message.status = EmailOutbox.STATUS_PENDING
+                message.next_attempt_at = now + self.backoff(message.attempts)
+                message.last_error = error
+                retried += 1
+
+        EmailOutbox.objects.bulk_update(
+            messages,
+            ["status", "attempts", "claimed_by", "claimed_at", "sent_at", "next_attempt_at", "last_error"],
+        )
+        return sent, retried, failed
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,144 @@
+# programs/profiling.py
+#
+# On-demand request profiling: cProfile stats plus the SQL a request ran, written to
+# PROFILING_DIR and listed/downloaded through the admin-only /api/profiles/ endpoints.
+
+import cProfile
+import io
+import json
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+NAME_RE = re.compile(r"^[\w\-]+\.(prof|json)$")
+
+# one capture at a time per process: a second live profiler would skew both
+# (and on Python 3.12+ cProfile refuses to start while another one is enabled)
+_capture_lock = threading.Lock()
+
+
+def profiles_dir():
+    return Path(getattr(settings, "PROFILING_DIR", "profiles"))
+
+
+class SQLRecorder:
+    # SQL text only: parameter values (OTPs, password hashes, tokens, emails) never
+    # reach PROFILING_DIR, just how many there were
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "alias": context["connection"].alias,
+                "sql": sql,
+                "param_count": len(params) if params else 0,
+                "many": many,
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def profile_request(get_response, request, labeller, reason):
+    """
+    Run get_response(request) under cProfile, save the capture and return the response.
+    `labeller(request)` names the capture; it runs afterwards, once the URL has resolved.
+    If another capture is already running in this process the request is served unprofiled.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        return get_response(request)
+    try:
+        return _capture(get_response, request, labeller, reason)
+    finally:
+        _capture_lock.release()
+
+
+def _capture(get_response, request, labeller, reason):
+    recorder = SQLRecorder()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    duration = time.perf_counter() - start
+    label = labeller(request)
+
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9]+', '_', label)}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(directory / f"{name}.prof")
+
+    top = io.StringIO()
+    pstats.Stats(profiler, stream=top).sort_stats("cumulative").print_stats(30)
+    meta = {
+        "name": name,
+        "view": label,
+        "reason": reason,
+        "method": request.method,
+        "path": _route(request),
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 3),
+        "query_count": len(recorder.queries),
+        "query_ms": round(sum(q["ms"] for q in recorder.queries), 3),
+        "queries": recorder.queries,
+        "top_functions": top.getvalue(),
+    }
+    (directory / f"{name}.json").write_text(json.dumps(meta, indent=2))
+    prune(directory)
+
+    response["X-Profile-Id"] = name
+    return response
+
+
+def _route(request):
+    # The URL pattern, not the URL: reset / verification links carry live tokens in the
+    # path, and query strings can hold anything
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.route:
+        return "unmatched"
+    return "/" + match.route
+
+
+def prune(directory):
+    keep = getattr(settings, "PROFILING_MAX_CAPTURES", 200)
+    captures = sorted(directory.glob("*.json"), reverse=True)
+    for meta in captures[keep:]:
+        meta.unlink(missing_ok=True)
+        meta.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def list_captures():
+    captures = []
+    for path in sorted(profiles_dir().glob("*.json"), reverse=True):
+        try:
+            meta = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        captures.append({k: meta.get(k) for k in (
+            "name", "view", "reason", "method", "path", "status", "duration_ms", "query_count", "query_ms"
+        )})
+    return captures
+
+
+def capture_path(filename):
+    """
+    Path of a capture file, or None if the name is not a plain capture filename.
+    """
+    if not NAME_RE.match(filename):
+        return None
+    path = profiles_dir() / filename
+    return path if path.is_file() else None
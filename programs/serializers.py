@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Exercise, Prescription, UserProfile
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
+from .auth import issue_tokens
 
 class ExerciseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -61,14 +61,15 @@ class LoginSerializer(serializers.Serializer):
         password = data.get("password")
 
         if username and password:
-            user = authenticate(username=username, password=password)
+            user = authenticate(self.context.get("request"), username=username, password=password)
             if not user:
                 raise serializers.ValidationError("Invalid username or password.")
         else:
             raise serializers.ValidationError("Both username and password are required.")
 
         # If authentication succeeds, generate tokens
-        refresh = RefreshToken.for_user(user)
+        self.user = user  # so the view doesn't have to fetch it again
+        refresh = issue_tokens(user)  # carries the profile claims ClaimsJWTAuthentication reads
         
         return {
             "username": user.username,
@@ -29,3 +29,22 @@ class AgeLogic:
         if 2 <= ta <= 4:
             return "kid"
         return "adult"
+
+    def get_bracket(self, training_age: int) -> str:
+        """
+        Map training_age to the WorkoutSlotLogic.training_bracket label ("0-1", "2-4", "5+").
+        Same thresholds as get_level.
+        """
+        return {"baby": "0-1", "kid": "2-4", "adult": "5+"}[self.get_level(training_age)]
+
+    def get_phase(self, training_month: int) -> int:
+        """
+        Months 1-4 of training are phase 1, everything after is phase 2.
+        """
+        return 1 if training_month <= 4 else 2
+
+    def phase_start_month(self, phase: int) -> int:
+        """
+        First training month of `phase` (inverse of get_phase).
+        """
+        return 1 if phase <= 1 else 5
@@ -0,0 +1,271 @@
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+from django.db import transaction
+
+from ..models import Exercise, WorkoutSlotLogic
+from .book_loader import SlotLogicLoader
+from .catalog import bump_catalog_version
+from .slot_plans import bump_slot_plan_version
+
+BRACKETS = ("0-1", "2-4", "5+")
+SLOTS_PER_PLAN = 16
+
+# Spreadsheet header -> WorkoutSlotLogic field. Short names match load_book_data's dicts.
+COLUMN_ALIASES = {
+    "bracket": "training_bracket",
+    "training_bracket": "training_bracket",
+    "phase": "phase",
+    "slot": "slot_number",
+    "slot_number": "slot_number",
+    "pattern": "movement_pattern",
+    "movement_pattern": "movement_pattern",
+    "base": "base_exercise",
+    "base_exercise": "base_exercise",
+    "easy": "progression_exercise",
+    "progression": "progression_exercise",
+    "progression_exercise": "progression_exercise",
+    "hard": "regression_exercise",
+    "regression": "regression_exercise",
+    "regression_exercise": "regression_exercise",
+}
+REQUIRED_COLUMNS = ("training_bracket", "phase", "slot_number", "movement_pattern", "base_exercise")
+
+
+class BookFormatError(Exception):
+    pass
+
+
+def normalise_header(name):
+    return re.sub(r"[\s\-]+", "_", str(name).strip().lower())
+
+
+def normalise_name(value):
+    """
+    Trim and collapse whitespace; empty cells become None.
+    """
+    if value is None:
+        return None
+    value = re.sub(r"\s+", " ", str(value)).strip()
+    return value or None
+
+
+def _columns(headers):
+    mapping = {}
+    for idx, header in enumerate(headers):
+        target = COLUMN_ALIASES.get(normalise_header(header))
+        if target and target not in mapping.values():
+            mapping[idx] = target
+    missing = [c for c in REQUIRED_COLUMNS if c not in mapping.values()]
+    if missing:
+        raise BookFormatError(f"Missing column(s): {', '.join(missing)}")
+    return mapping
+
+
+def iter_csv_chunks(path, chunk_size):
+    """
+    Yield lists of (line_number, {field: value}) from a CSV, chunk_size rows at a time.
+    """
+    mapping = None
+    for df in pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+        if mapping is None:
+            mapping = _columns(df.columns)
+        chunk = []
+        # header is line 1
+        for line, values in zip(df.index + 2, df.itertuples(index=False, name=None)):
+            chunk.append((int(line), {target: values[idx] for idx, target in mapping.items()}))
+        yield chunk
+
+
+def iter_xlsx_chunks(path, chunk_size, sheet=None):
+    """
+    Same as iter_csv_chunks for .xlsx, using openpyxl's read-only (streaming) mode.
+    """
+    try:
+        import openpyxl
+    except ImportError:
+        raise BookFormatError("Reading .xlsx files needs openpyxl (pip install openpyxl).")
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = workbook[sheet] if sheet else workbook.active
+        rows = ws.iter_rows(values_only=True)
+        mapping = _columns(next(rows, ()))
+        chunk = []
+        for line, values in enumerate(rows, start=2):
+            if not any(v not in (None, "") for v in values):
+                continue
+            chunk.append((line, {
+                target: ("" if idx >= len(values) or values[idx] is None else values[idx])
+                for idx, target in mapping.items()
+            }))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def iter_book_chunks(path, chunk_size=5000, sheet=None):
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return iter_csv_chunks(path, chunk_size)
+    if suffix in (".xlsx", ".xlsm"):
+        return iter_xlsx_chunks(path, chunk_size, sheet)
+    raise BookFormatError(f"Unsupported file type '{suffix}' (expected .csv or .xlsx)")
+
+
+def validate_row(raw):
+    """
+    Returns (row, None) for a valid spreadsheet row or (None, reason).
+    """
+    bracket = normalise_name(raw.get("training_bracket"))
+    if bracket not in BRACKETS:
+        return None, f"bracket must be one of {', '.join(BRACKETS)} (got {bracket!r})"
+
+    try:
+        phase = int(float(raw.get("phase")))
+        slot = int(float(raw.get("slot_number")))
+    except (TypeError, ValueError):
+        return None, "phase and slot must be integers"
+    if phase < 1:
+        return None, f"phase must be >= 1 (got {phase})"
+    if not 1 <= slot <= SLOTS_PER_PLAN:
+        return None, f"slot must be between 1 and {SLOTS_PER_PLAN} (got {slot})"
+
+    pattern = normalise_name(raw.get("movement_pattern"))
+    base = normalise_name(raw.get("base_exercise"))
+    if not pattern or not base:
+        return None, "pattern and base exercise are required"
+    if len(pattern) > WorkoutSlotLogic._meta.get_field("movement_pattern").max_length:
+        return None, "pattern is too long"
+    if len(base) > Exercise._meta.get_field("name").max_length:
+        return None, "base exercise is too long"
+
+    return {
+        "training_bracket": bracket,
+        "phase": phase,
+        "slot_number": slot,
+        "movement_pattern": pattern,
+        "base_exercise": base,
+        "progression_exercise": normalise_name(raw.get("progression_exercise")),
+        "regression_exercise": normalise_name(raw.get("regression_exercise")),
+    }, None
+
+
+@dataclass
+class IngestReport:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    invalid: int = 0
+    exercises_created: int = 0
+    sample_size: int = 50
+    changes: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def note_change(self, line):
+        if len(self.changes) < self.sample_size:
+            self.changes.append(line)
+
+    def note_error(self, line_number, message):
+        self.invalid += 1
+        if len(self.errors) < self.sample_size:
+            self.errors.append(f"line {line_number}: {message}")
+
+    def summary(self):
+        return (
+            f"{self.rows} rows read: {self.created} created, {self.updated} updated, "
+            f"{self.deleted} deleted, {self.unchanged} unchanged, {self.invalid} invalid, "
+            f"{self.exercises_created} new exercises"
+        )
+
+
+def _label(key):
+    bracket, phase, slot = key
+    return f"{bracket} phase {phase} slot {slot}"
+
+
+class BookIngestor:
+    """
+    Streams program-book chunks into WorkoutSlotLogic.
+
+    Each chunk is validated, diffed only against the stored (bracket, phase) groups it
+    touches and written with the SlotLogicLoader upsert, so memory is bounded by the chunk
+    size. The whole file goes in one transaction; with dry_run it is rolled back.
+    """
+
+    def __init__(self, loader: SlotLogicLoader | None = None, sample_size=50):
+        self.loader = loader or SlotLogicLoader()
+        self.sample_size = sample_size
+
+    def run(self, chunks, dry_run=False, prune=False):
+        report = IngestReport(sample_size=self.sample_size)
+        seen = set()
+
+        with transaction.atomic():
+            for chunk in chunks:
+                rows = []
+                for line, raw in chunk:
+                    report.rows += 1
+                    row, error = validate_row(raw)
+                    if error:
+                        report.note_error(line, error)
+                        continue
+                    key = self.loader.key(row)
+                    if key in seen:
+                        report.note_error(line, f"duplicate {_label(key)}; earlier row kept")
+                        continue
+                    seen.add(key)
+                    rows.append(row)
+
+                self._apply_chunk(rows, report, dry_run)
+
+            if prune:
+                self._prune(seen, report, dry_run)
+
+            if dry_run:
+                transaction.set_rollback(True)
+            else:
+                if report.exercises_created:
+                    bump_catalog_version()
+                if report.created or report.updated or report.deleted:
+                    bump_slot_plan_version()
+
+        return report
+
+    def _apply_chunk(self, rows, report, dry_run):
+        existing = self.loader.existing_for([self.loader.key(r) for r in rows])
+        result = self.loader.diff(rows, existing, prune=False)
+
+        report.created += len(result.create)
+        report.updated += len(result.update)
+        report.unchanged += result.unchanged
+        for obj in result.create:
+            report.note_change(f"+ {_label(self.loader.key(obj.__dict__))}: {obj.base_exercise}")
+        for key, changes in result.changed_fields.items():
+            for f, old, new in changes:
+                report.note_change(f"~ {_label(key)} {f}: {old!r} -> {new!r}")
+
+        if not dry_run:
+            report.exercises_created += self.loader.ensure_exercises(rows)
+            self.loader.apply(result)
+
+    def _prune(self, seen, report, dry_run):
+        stale = []
+        for pk, *key in WorkoutSlotLogic.objects.values_list(
+            "pk", "training_bracket", "phase", "slot_number"
+        ).iterator(chunk_size=2000):
+            if tuple(key) not in seen:
+                stale.append(pk)
+                report.note_change(f"- {_label(key)}")
+        report.deleted = len(stale)
+        if stale and not dry_run:
+            for start in range(0, len(stale), self.loader.BATCH_SIZE):
+                self.loader.delete_slots(stale[start:start + self.loader.BATCH_SIZE])
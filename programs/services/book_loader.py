@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from ..models import Exercise, WorkoutSlotLogic
+from .catalog import bump_catalog_version
+from .slot_plans import bump_slot_plan_version
+
+
+@dataclass
+class SlotDiff:
+    create: list = field(default_factory=list)
+    update: list = field(default_factory=list)
+    delete: list = field(default_factory=list)
+    unchanged: int = 0
+    exercises_created: int = 0
+    # key -> [(field, old, new)] for every row in `update`
+    changed_fields: dict = field(default_factory=dict)
+
+    def summary(self):
+        return (
+            f"{len(self.create)} created, {len(self.update)} updated, "
+            f"{len(self.delete)} deleted, {self.unchanged} unchanged, "
+            f"{self.exercises_created} new exercises"
+        )
+
+
+class SlotLogicLoader:
+    """
+    Applies a set of WorkoutSlotLogic rows as a diff against what is already stored.
+
+    Each row is a dict with training_bracket, phase, slot_number, movement_pattern,
+    base_exercise, progression_exercise and regression_exercise. Everything is written
+    with bulk upserts inside one transaction, so readers see either the old catalog or
+    the new one, never a mix.
+    """
+    KEY_FIELDS = ("training_bracket", "phase", "slot_number")
+    VALUE_FIELDS = ("movement_pattern", "base_exercise", "progression_exercise", "regression_exercise")
+    # movement_pattern prefix -> (Exercise.category, Exercise.kind) for exercises the book
+    # introduces; anything else is strength work
+    PATTERN_TYPES = (
+        ("WARMUP", "flexibility", "mobility"),
+        ("SPEED", "cardio", "plyo"),
+        ("MEDICINE BALL", "strength", "plyo"),
+        ("FINISHER", "cardio", "cardio"),
+    )
+    BATCH_SIZE = 500
+
+    def key(self, row):
+        return tuple(row[f] for f in self.KEY_FIELDS)
+
+    def diff(self, rows, existing, prune=True):
+        """
+        rows: iterable of dicts; existing: {key: WorkoutSlotLogic}. Nothing is written.
+        """
+        result = SlotDiff()
+        seen = set()
+
+        for row in rows:
+            k = self.key(row)
+            seen.add(k)
+            current = existing.get(k)
+            if current is None:
+                result.create.append(WorkoutSlotLogic(**{f: row[f] for f in self.KEY_FIELDS + self.VALUE_FIELDS}))
+                continue
+
+            changed = []
+            for f in self.VALUE_FIELDS:
+                old = getattr(current, f)
+                if old != row[f]:
+                    changed.append((f, old, row[f]))
+                    setattr(current, f, row[f])
+            if changed:
+                result.update.append(current)
+                result.changed_fields[k] = changed
+            else:
+                result.unchanged += 1
+
+        if prune:
+            result.delete = [obj for k, obj in existing.items() if k not in seen]
+        return result
+
+    def existing(self, queryset=None):
+        queryset = queryset if queryset is not None else WorkoutSlotLogic.objects.all()
+        return {(s.training_bracket, s.phase, s.slot_number): s for s in queryset}
+
+    def existing_for(self, keys):
+        """
+        Stored rows for just the (bracket, phase) groups that `keys` touch, locked for update.
+        """
+        groups = {(bracket, phase) for bracket, phase, _ in keys}
+        if not groups:
+            return {}
+        condition = Q()
+        for bracket, phase in groups:
+            condition |= Q(training_bracket=bracket, phase=phase)
+        return self.existing(WorkoutSlotLogic.objects.select_for_update().filter(condition))
+
+    def ensure_exercises(self, rows):
+        """
+        Create an Exercise for every base exercise not yet in the catalog. Returns how many were new.
+        """
+        wanted = {}
+        for row in rows:
+            slug = slugify(row["base_exercise"])
+            if slug and slug not in wanted:
+                category, kind = self.exercise_type(row["movement_pattern"])
+                wanted[slug] = Exercise(slug=slug, name=row["base_exercise"], category=category, kind=kind)
+
+        known = set(Exercise.objects.filter(slug__in=list(wanted)).values_list("slug", flat=True))
+        missing = [e for slug, e in wanted.items() if slug not in known]
+        # A different slug may already carry the same (unique) name: that exercise exists too
+        taken = set(Exercise.objects.filter(name__in=[e.name for e in missing]).values_list("name", flat=True))
+        missing = [e for e in missing if e.name not in taken]
+        Exercise.objects.bulk_create(missing, batch_size=self.BATCH_SIZE, ignore_conflicts=True)
+        return len(missing)
+
+    @classmethod
+    def exercise_type(cls, pattern):
+        pattern = (pattern or "").upper()
+        for prefix, category, kind in cls.PATTERN_TYPES:
+            if pattern.startswith(prefix):
+                return category, kind
+        return "strength", "strength"
+
+    def apply(self, result):
+        # Creates and updates go out together as a native upsert (INSERT .. ON CONFLICT DO UPDATE);
+        # much cheaper than bulk_update's CASE/WHEN per field.
+        upserts = result.create + [
+            WorkoutSlotLogic(**{f: getattr(obj, f) for f in self.KEY_FIELDS + self.VALUE_FIELDS})
+            for obj in result.update
+        ]
+        WorkoutSlotLogic.objects.bulk_create(
+            upserts,
+            batch_size=self.BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=self.KEY_FIELDS,
+            update_fields=self.VALUE_FIELDS,
+        )
+        if result.delete:
+            self.delete_slots([obj.pk for obj in result.delete])
+
+    @staticmethod
+    def delete_slots(pks):
+        # One DELETE with no post_delete per row (each of which would bump the slot-plan
+        # version); callers bump once. Safe because nothing references WorkoutSlotLogic.
+        queryset = WorkoutSlotLogic.objects.filter(pk__in=pks)
+        return queryset._raw_delete(queryset.db)
+
+    def load(self, rows, prune=True, dry_run=False):
+        rows = list(rows)
+        with transaction.atomic():
+            result = self.diff(rows, self.existing(WorkoutSlotLogic.objects.select_for_update()), prune=prune)
+            if dry_run:
+                return result
+
+            result.exercises_created = self.ensure_exercises(rows)
+            self.apply(result)
+
+            # bulk_* skip model signals, so bump the versions explicitly. The SnapshotVersion
+            # rows commit with this transaction, so web workers rebuild even though this runs
+            # in its own process (load_book_data).
+            if result.exercises_created:
+                bump_catalog_version()
+            if result.create or result.update or result.delete:
+                bump_slot_plan_version()
+        return result
@@ -0,0 +1,159 @@
+import numpy as np
+
+from .age_logic import AgeLogic
+from .catalog import CatalogProvider, default_catalog
+
+PLAN_SIZE = 16
+DAYS = 4
+PER_DAY = 4
+# m above this samples by rejection instead of argsorting an (n, m) matrix
+_ARGSORT_SAMPLE_LIMIT = 256
+
+
+class LevelArrays:
+    """
+    Structure-of-arrays view of one level's candidates (same order as
+    SchedulerService.get_candidates_for_level), with each plan entry prebuilt once.
+    """
+
+    def __init__(self, pairs):
+        self.size = len(pairs)
+        self.is_plyo = np.fromiter((e.kind == "plyo" for e, _ in pairs), dtype=bool, count=self.size)
+        self.sets = np.fromiter((p.sets for _, p in pairs), dtype=np.int32, count=self.size)
+        self.reps = np.fromiter((p.reps for _, p in pairs), dtype=np.int32, count=self.size)
+        self.rest = np.fromiter((p.rest for _, p in pairs), dtype=np.int32, count=self.size)
+        # Shared between every plan that picks the exercise: read-only
+        self.entries = [
+            {"exercise": e.name, "kind": e.kind, "sets": p.sets, "reps": p.reps, "rest": p.rest}
+            for e, p in pairs
+        ]
+
+
+class LevelPlans:
+    """
+    Plans for the users of one level. Row i of `exercises` holds candidate indices in
+    output order and row i of `days` the 0-based day each one lands on (-1 = unused).
+    """
+
+    def __init__(self, arrays, user_index, exercises, days):
+        self.arrays = arrays
+        self.user_index = user_index
+        self.exercises = exercises
+        self.days = days
+
+    def plan(self, row):
+        days = [[] for _ in range(DAYS)]
+        entries = self.arrays.entries
+        for idx, day in zip(self.exercises[row].tolist(), self.days[row].tolist()):
+            if day >= 0:
+                days[day].append(entries[idx])
+        return [{"day": i + 1, "exercises": days[i]} for i in range(DAYS)]
+
+
+class BulkScheduler:
+    """
+    Builds 4-day plans for many users at once.
+
+    Users are grouped by level; selection (random 16 of the level's candidates) and the
+    plyo-first round-robin day assignment of SchedulerService.build_4_day_plan are done
+    with NumPy index arrays, so plans follow the same distribution without a Python
+    loop per user.
+
+    Only run_benchmarks uses it for now. Stored weekly plans (WeeklyPlanService, the
+    refresh_weekly_plans command) must equal SchedulerService.seeded_4_day_plan, which
+    seeds one RNG per (user, week) so inline rebuilds reproduce them; the shared RNG
+    here draws different plans for the same users.
+    """
+
+    def __init__(self, age_logic: AgeLogic | None = None, catalog: CatalogProvider | None = None):
+        self.age_logic = age_logic or AgeLogic()
+        self.catalog = catalog or default_catalog
+
+    def levels_for(self, training_ages):
+        ages = np.asarray(training_ages, dtype=np.int64)
+        # Same thresholds as AgeLogic.get_level
+        return np.select([ages <= 1, ages <= 4], ["baby", "kid"], default="adult")
+
+    def level_arrays(self, snapshot, level):
+        return snapshot.memo(f"soa:{level}", lambda s: LevelArrays(s.for_level(level)))
+
+    def plan_indices(self, training_ages, seed=None, chunk_size=100_000):
+        """
+        Returns a list of LevelPlans (one per level chunk) covering every user.
+        """
+        rng = np.random.default_rng(seed)
+        snapshot = self.catalog.get()
+        levels = self.levels_for(training_ages)
+
+        results = []
+        for level in np.unique(levels):
+            arrays = self.level_arrays(snapshot, str(level))
+            users = np.flatnonzero(levels == level)
+            for start in range(0, len(users), chunk_size):
+                chunk = users[start:start + chunk_size]
+                exercises, days = self._assign(arrays, len(chunk), rng)
+                results.append(LevelPlans(arrays, chunk, exercises, days))
+        return results
+
+    def build_plans(self, training_ages, seed=None, chunk_size=100_000):
+        """
+        Plans in the same shape as SchedulerService.build_4_day_plan, in input order.
+        """
+        plans = [None] * len(training_ages)
+        for group in self.plan_indices(training_ages, seed, chunk_size):
+            for row, user in enumerate(group.user_index.tolist()):
+                plans[user] = group.plan(row)
+        return plans
+
+    def _select(self, m, n, rng):
+        if m <= PLAN_SIZE:
+            # select_16 keeps every candidate in catalog order
+            return np.broadcast_to(np.arange(m), (n, m))
+        if m <= _ARGSORT_SAMPLE_LIMIT:
+            return np.argsort(rng.random((n, m)), axis=1)[:, :PLAN_SIZE]
+
+        # Large catalogs: draw with replacement and redraw rows that repeat an index.
+        # Conditioning on "all distinct" leaves a uniform ordered sample, like random.sample.
+        sel = rng.integers(0, m, size=(n, PLAN_SIZE))
+        while True:
+            s = np.sort(sel, axis=1)
+            bad = np.flatnonzero((s[:, 1:] == s[:, :-1]).any(axis=1))
+            if not len(bad):
+                return sel
+            sel[bad] = rng.integers(0, m, size=(len(bad), PLAN_SIZE))
+
+    def _assign(self, arrays, n, rng):
+        m = arrays.size
+        if m == 0:
+            return np.zeros((n, 0), dtype=np.int64), np.zeros((n, 0), dtype=np.int8)
+
+        sel = self._select(m, n, rng)
+        k = sel.shape[1]
+        plyo = arrays.is_plyo[sel]
+
+        # Plyo: round-robin over days in selection order
+        plyo_rank = np.cumsum(plyo, axis=1) - 1
+        plyo_day = plyo_rank % DAYS
+        per_day = np.stack([(plyo & (plyo_day == d)).sum(axis=1) for d in range(DAYS)], axis=1)
+
+        # Non-plyo: shuffled, then fill each day up to PER_DAY in day order
+        keys = np.where(plyo, np.inf, rng.random((n, k)))
+        order = np.argsort(keys, axis=1)
+        nonplyo_rank = np.empty_like(order)
+        np.put_along_axis(nonplyo_rank, order, np.arange(k)[None, :], axis=1)
+
+        capacity = np.cumsum(np.maximum(PER_DAY - per_day, 0), axis=1)
+        nonplyo_day = (nonplyo_rank[:, :, None] >= capacity[:, None, :]).sum(axis=2)
+        # Anything past 16 slots wraps round-robin (unreachable with <= 16 picks)
+        overflow = nonplyo_day >= DAYS
+        nonplyo_day = np.where(overflow, (nonplyo_rank - capacity[:, -1:]) % DAYS, nonplyo_day)
+
+        day = np.where(plyo, plyo_day, nonplyo_day)
+        rank = np.where(plyo, plyo_rank, nonplyo_rank)
+        # Within a day: plyo first, then non-plyo, each in its own order
+        sort_key = day * (4 * PLAN_SIZE) + (~plyo) * (2 * PLAN_SIZE) + rank
+        out = np.argsort(sort_key, axis=1, kind="stable")
+
+        exercises = np.take_along_axis(np.asarray(sel), out, axis=1)
+        days = np.take_along_axis(day, out, axis=1).astype(np.int8)
+        return exercises, days
@@ -0,0 +1,313 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from ..db_router import primary_reads
+from ..models import Exercise, Prescription, SnapshotVersion
+from . import catalog_file
+from .memo import TieredCache
+
+CATALOG_VERSION_KEY = "programs:catalog-version"
+
+
+@dataclass(frozen=True, slots=True)
+class ExerciseRow:
+    id: int
+    name: str
+    category: str
+    kind: str
+    slug: str
+
+
+@dataclass(frozen=True, slots=True)
+class PrescriptionRow:
+    id: int
+    exercise: ExerciseRow
+    level: str
+    sets: int
+    reps: int
+    rest: int
+
+    @property
+    def exercise_id(self):
+        return self.exercise.id
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of every Exercise / Prescription row, indexed the way the services read them.
+
+    Built once per catalog version and shared by all threads; nothing in here touches the DB.
+    """
+
+    def __init__(self, version, exercises, prescriptions):
+        self.version = version
+        self._memo = {}
+
+        by_id = {}
+        by_category = {}
+        by_kind = {}
+        for e in exercises:
+            by_id[e.id] = e
+            by_category.setdefault(e.category, []).append(e)
+            by_kind.setdefault(e.kind, []).append(e)
+
+        by_key = {}
+        by_level = {}
+        for p in prescriptions:
+            by_key[(p.exercise.id, p.level)] = p
+            by_level.setdefault(p.level, []).append((p.exercise, p))
+
+        self.exercises = MappingProxyType(by_id)
+        self.by_category = MappingProxyType({k: tuple(v) for k, v in by_category.items()})
+        self.by_kind = MappingProxyType({k: tuple(v) for k, v in by_kind.items()})
+        self.prescriptions = MappingProxyType(by_key)
+        self.by_level = MappingProxyType({k: tuple(v) for k, v in by_level.items()})
+
+    def __reduce__(self):
+        # Pickled for the shared snapshot cache; memoized artefacts are rebuilt on demand
+        return CatalogSnapshot, (self.version, tuple(self.exercises.values()), tuple(self.prescriptions.values()))
+
+    def category_options(self, category):
+        return self.by_category.get(category, ())
+
+    def prescription(self, exercise_id, level):
+        return self.prescriptions.get((exercise_id, level))
+
+    def for_level(self, level):
+        # (exercise, prescription) pairs, one per exercise, in Prescription pk order
+        return self.by_level.get(level, ())
+
+    @property
+    def fingerprint(self):
+        """
+        Content hash of the catalog. Unlike `version` (which moves on every bump, even one
+        that changes nothing) it only depends on the rows, so it can seed reproducible plans.
+        """
+        return self.memo("fingerprint", _fingerprint)
+
+    def level_fingerprint(self, level):
+        """
+        Content hash of just the (exercise, prescription) pairs for `level`; plans built
+        from for_level(level) only need regenerating when this changes.
+        """
+        return self.memo(("level-fingerprint", level), lambda snapshot: _level_fingerprint(snapshot, level))
+
+    def memo(self, key, builder):
+        """
+        Return builder(self), computed once per snapshot. Derived artefacts (rendered
+        payloads etc.) therefore go stale exactly when the catalog does.
+        """
+        try:
+            return self._memo[key]
+        except KeyError:
+            # Racing threads may both build; the results are identical so last write wins
+            value = self._memo[key] = builder(self)
+            return value
+
+
+def _fingerprint(snapshot):
+    h = hashlib.sha256()
+    for e in snapshot.exercises.values():
+        h.update(repr((e.id, e.name, e.category, e.kind, e.slug)).encode())
+    for (exercise_id, level), p in sorted(snapshot.prescriptions.items()):
+        h.update(repr((p.id, exercise_id, level, p.sets, p.reps, p.rest)).encode())
+    return h.hexdigest()[:16]
+
+
+def _level_fingerprint(snapshot, level):
+    h = hashlib.sha256()
+    for e, p in snapshot.for_level(level):
+        h.update(repr((e.id, e.name, e.category, e.kind, e.slug, p.id, p.sets, p.reps, p.rest)).encode())
+    return h.hexdigest()[:16]
+
+
+# key -> (version, monotonic time it was read). Versions live in SnapshotVersion rows so
+# that edits made by any process (another worker, the admin, a management command) reach
+# every worker; to keep that off the hot path a process re-reads them at most every
+# CACHE_VERSION_CHECK_INTERVAL seconds, and sees its own bumps at once.
+_checked_versions = {}
+
+
+def _recently_checked(key):
+    interval = getattr(settings, "CACHE_VERSION_CHECK_INTERVAL", 0)
+    checked = _checked_versions.get(key)
+    if interval and checked is not None and time.monotonic() - checked[1] < interval:
+        return checked[0]
+    return None
+
+
+def _create_version(key):
+    # First use of `key`: start from a value no earlier snapshot can have
+    row, _ = SnapshotVersion.objects.get_or_create(key=key, defaults={"version": time.time_ns()})
+    return row.version
+
+
+def current_version(key):
+    version = _recently_checked(key)
+    if version is not None:
+        return version
+    version = SnapshotVersion.objects.filter(key=key).values_list("version", flat=True).first()
+    if version is None:
+        version = _create_version(key)
+    _checked_versions[key] = (version, time.monotonic())
+    return version
+
+
+async def acurrent_version(key):
+    version = _recently_checked(key)
+    if version is not None:
+        return version
+    version = await SnapshotVersion.objects.filter(key=key).values_list("version", flat=True).afirst()
+    if version is None:
+        version = await sync_to_async(_create_version)(key)
+    _checked_versions[key] = (version, time.monotonic())
+    return version
+
+
+def bump_version(key):
+    """
+    Invalidate every process's snapshot for `key`. The row is written in the caller's
+    transaction, so other processes see the new version together with the rows that
+    caused it, and never if it rolls back. A fresh value (not +1) is used so a version
+    seen inside a rolled-back transaction is never handed out again.
+    """
+    if not SnapshotVersion.objects.filter(key=key).update(version=time.time_ns()):
+        _create_version(key)
+    _checked_versions.pop(key, None)
+    transaction.on_commit(lambda: _checked_versions.pop(key, None))
+
+
+def current_catalog_version():
+    return current_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+class VersionedProvider:
+    """
+    Hands out an immutable snapshot, rebuilding it (under a lock) when the version stored
+    under `version_key` moves. Subclasses implement build(version).
+    """
+    version_key = None
+    # Read from the CATALOG_SNAPSHOT_PATH export when one is configured
+    from_snapshot_file = False
+    # Share built snapshots through the cache: after a bump one worker reads the DB and
+    # the others load its result (snapshots must be picklable)
+    shared = False
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._shared = TieredCache(f"snapshot:{self.version_key}", maxsize=1) if self.shared else None
+
+    def current(self):
+        """
+        The version a snapshot must carry to be fresh. With CATALOG_SNAPSHOT_PATH set (and
+        the file exported) that is the file's stat stamp instead of the SnapshotVersion row.
+        """
+        version = catalog_file.file_version() if self.from_snapshot_file else None
+        return version if version is not None else current_version(self.version_key)
+
+    async def acurrent(self):
+        # stat() doesn't block on the network, so the file check stays inline
+        version = catalog_file.file_version() if self.from_snapshot_file else None
+        return version if version is not None else await acurrent_version(self.version_key)
+
+    def get(self):
+        version = self.current()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                # Stamp with the version read *before* querying: a bump during the
+                # build just means the next get() rebuilds again.
+                snapshot = self._build(version)
+                self._snapshot = snapshot
+        return snapshot
+
+    async def aget(self):
+        """
+        get() for async views: the version check uses the async ORM, and only a rebuild
+        goes through sync_to_async.
+        """
+        version = await self.acurrent()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return await sync_to_async(self.get)()
+
+    def _build(self, version):
+        if catalog_file.is_file_version(version):
+            return self.build(version)
+        if self._shared is None:
+            return self._build_on_primary(version)
+        return self._shared.get_or_set(version, lambda: self._build_on_primary(version))
+
+    def _build_on_primary(self, version):
+        # The version came from the primary; a lagging replica would hand back older rows
+        # under it, and the shared tier would then serve them to every worker
+        with primary_reads():
+            return self.build(version)
+
+    def build(self, version):
+        raise NotImplementedError
+
+    def invalidate(self):
+        self._snapshot = None
+        if self._shared is not None:
+            self._shared.clear()
+
+
+class CatalogProvider(VersionedProvider):
+    """
+    Provider for the Exercise / Prescription CatalogSnapshot.
+    """
+    version_key = CATALOG_VERSION_KEY
+    from_snapshot_file = True
+    shared = True
+
+    def build(self, version) -> CatalogSnapshot:
+        if catalog_file.is_file_version(version):
+            return self.build_from_file(catalog_file.load(version[1]), version)
+
+        # One LEFT JOIN round-trip: every exercise plus each of its prescriptions (if any)
+        rows = Exercise.objects.order_by("id").values_list(
+            "id", "name", "category", "kind", "slug",
+            "prescription__id", "prescription__level", "prescription__sets",
+            "prescription__reps", "prescription__rest",
+        )
+        exercises = {}
+        prescriptions = []
+        for ex_id, name, category, kind, slug, p_id, level, sets, reps, rest in rows:
+            exercise = exercises.get(ex_id)
+            if exercise is None:
+                exercise = exercises[ex_id] = ExerciseRow(ex_id, name, category, kind, slug)
+            if p_id is not None:
+                prescriptions.append(PrescriptionRow(p_id, exercise, level, sets, reps, rest))
+        prescriptions.sort(key=lambda p: p.id)
+        return CatalogSnapshot(version, exercises.values(), prescriptions)
+
+    def build_from_file(self, snapshot_file, version) -> CatalogSnapshot:
+        # No DB round-trip: rows come from the mmapped export (see export_catalog_snapshot)
+        exercises = {row[0]: ExerciseRow(*row) for row in snapshot_file.exercise_tuples()}
+        prescriptions = [
+            PrescriptionRow(p_id, exercises[ex_id], level, sets, reps, rest)
+            for p_id, ex_id, level, sets, reps, rest in snapshot_file.prescription_tuples()
+        ]
+        return CatalogSnapshot(version, exercises.values(), prescriptions)
+
+
+# Process-wide provider shared by WorkoutService / SchedulerService
+default_catalog = CatalogProvider()
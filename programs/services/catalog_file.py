@@ -0,0 +1,300 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+
+from ..models import Exercise, Prescription, WorkoutSlotLogic
+
+# Layout: MAGIC, then <u8 header offset, <u8 header length>, then the sections (each
+# 8-byte aligned), then a JSON header describing them.
+MAGIC = b"GYMCAT\x00\x01"
+PREFIX = struct.Struct("<8sQQ")
+FORMAT_VERSION = 1
+ALIGN = 8
+NULL = 0xFFFFFFFF  # string id for NULL columns
+
+# String columns hold ids into the string table: string i is
+# string_data[string_offsets[i]:string_offsets[i + 1]], UTF-8.
+EXERCISE_DTYPE = np.dtype([
+    ("id", "<i8"), ("name", "<u4"), ("category", "<u4"), ("kind", "<u4"), ("slug", "<u4"),
+])
+PRESCRIPTION_DTYPE = np.dtype([
+    ("id", "<i8"), ("exercise_id", "<i8"), ("level", "<u4"), ("sets", "<i4"), ("reps", "<i4"), ("rest", "<i4"),
+])
+SLOT_DTYPE = np.dtype([
+    ("training_bracket", "<u4"), ("phase", "<i4"), ("slot_number", "<i4"), ("movement_pattern", "<u4"),
+    ("base_exercise", "<u4"), ("progression_exercise", "<u4"), ("regression_exercise", "<u4"),
+])
+SECTIONS = {
+    "exercises": EXERCISE_DTYPE,
+    "prescriptions": PRESCRIPTION_DTYPE,
+    "slots": SLOT_DTYPE,
+    "string_offsets": np.dtype("<u8"),
+    "string_data": np.dtype("u1"),
+}
+
+
+class CatalogFileError(Exception):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class SlotRow:
+    # Same attributes SlotPlanSnapshot reads from WorkoutSlotLogic
+    training_bracket: str
+    phase: int
+    slot_number: int
+    movement_pattern: str
+    base_exercise: str
+    progression_exercise: str | None
+    regression_exercise: str | None
+
+
+class StringTable:
+    """
+    Interns strings for export; every distinct value is stored once.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._encoded = []
+
+    def id(self, value):
+        if value is None:
+            return NULL
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self._encoded)
+            self._encoded.append(value.encode())
+        return i
+
+    def arrays(self):
+        offsets = np.zeros(len(self._encoded) + 1, dtype=SECTIONS["string_offsets"])
+        np.cumsum([len(b) for b in self._encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b"".join(self._encoded), dtype=SECTIONS["string_data"])
+
+
+def _descr(dtype):
+    return [list(field) for field in dtype.descr]
+
+
+def build_arrays():
+    """
+    Every Exercise, Prescription and WorkoutSlotLogic row as record arrays plus the string table.
+    """
+    strings = StringTable()
+    exercises = np.array([
+        (pk, strings.id(name), strings.id(category), strings.id(kind), strings.id(slug))
+        for pk, name, category, kind, slug in Exercise.objects.order_by("id").values_list(
+            "id", "name", "category", "kind", "slug"
+        )
+    ], dtype=EXERCISE_DTYPE)
+    prescriptions = np.array([
+        (pk, exercise_id, strings.id(level), sets, reps, rest)
+        for pk, exercise_id, level, sets, reps, rest in Prescription.objects.order_by("id").values_list(
+            "id", "exercise_id", "level", "sets", "reps", "rest"
+        )
+    ], dtype=PRESCRIPTION_DTYPE)
+    slots = np.array([
+        (strings.id(bracket), phase, number, strings.id(pattern),
+         strings.id(base), strings.id(progression), strings.id(regression))
+        for bracket, phase, number, pattern, base, progression, regression in WorkoutSlotLogic.objects.order_by(
+            "training_bracket", "phase", "slot_number"
+        ).values_list(
+            "training_bracket", "phase", "slot_number", "movement_pattern",
+            "base_exercise", "progression_exercise", "regression_exercise",
+        )
+    ], dtype=SLOT_DTYPE)
+    string_offsets, string_data = strings.arrays()
+    return {
+        "exercises": exercises,
+        "prescriptions": prescriptions,
+        "slots": slots,
+        "string_offsets": string_offsets,
+        "string_data": string_data,
+    }
+
+
+def content_hash(arrays):
+    h = hashlib.sha256()
+    for name in SECTIONS:
+        h.update(name.encode())
+        h.update(arrays[name].tobytes())
+    return h.hexdigest()[:16]
+
+
+def write_snapshot(path, arrays=None):
+    """
+    Export the catalog to `path`. The file is written next to it and renamed into place,
+    so readers see either the old snapshot or the new one, never a partial file.
+    Returns the header.
+    """
+    arrays = arrays if arrays is not None else build_arrays()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    header = {
+        "format": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "content_hash": content_hash(arrays),
+        "sections": {},
+    }
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".catalog-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * PREFIX.size)
+            for name, dtype in SECTIONS.items():
+                f.write(b"\0" * (-f.tell() % ALIGN))
+                header["sections"][name] = {
+                    "offset": f.tell(),
+                    "count": len(arrays[name]),
+                    "dtype": _descr(dtype),
+                }
+                f.write(arrays[name].tobytes())
+            encoded = json.dumps(header).encode()
+            header_offset = f.tell()
+            f.write(encoded)
+            f.seek(0)
+            f.write(PREFIX.pack(MAGIC, header_offset, len(encoded)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return header
+
+
+class CatalogFile:
+    """
+    A read-only memory map of an exported snapshot. The record arrays are zero-copy views
+    of the mapping, so every process on the host reads the same page-cache pages.
+
+    Stays valid after the path is replaced: the mapping keeps the old inode alive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                self.stamp = _stamp(st)
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            raise CatalogFileError(f"{path}: not a catalog snapshot")
+
+        if len(self._map) < PREFIX.size:
+            raise CatalogFileError(f"{path}: not a catalog snapshot")
+        magic, header_offset, header_length = PREFIX.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise CatalogFileError(f"{path}: not a catalog snapshot")
+        try:
+            self.header = json.loads(self._map[header_offset:header_offset + header_length])
+        except ValueError:
+            raise CatalogFileError(f"{path}: corrupt header")
+        if self.header.get("format") != FORMAT_VERSION:
+            raise CatalogFileError(f"{path}: format {self.header.get('format')}, expected {FORMAT_VERSION}")
+
+        self.arrays = {}
+        for name, dtype in SECTIONS.items():
+            section = self.header["sections"].get(name)
+            if section is None or section["dtype"] != _descr(dtype):
+                raise CatalogFileError(f"{path}: section {name!r} missing or of another layout")
+            self.arrays[name] = np.frombuffer(self._map, dtype=dtype, count=section["count"], offset=section["offset"])
+        self._strings = None
+
+    @property
+    def content_hash(self):
+        return self.header["content_hash"]
+
+    def strings(self):
+        # Decoded once per file; the table holds each distinct value a single time
+        if self._strings is None:
+            offsets = self.arrays["string_offsets"].tolist()
+            data = self.arrays["string_data"].tobytes()
+            self._strings = [data[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+        return self._strings
+
+    def _text(self, i):
+        return None if i == NULL else self.strings()[i]
+
+    def exercise_tuples(self):
+        # (id, name, category, kind, slug) in id order
+        s = self.strings()
+        return [
+            (pk, s[name], s[category], s[kind], s[slug])
+            for pk, name, category, kind, slug in self.arrays["exercises"].tolist()
+        ]
+
+    def prescription_tuples(self):
+        # (id, exercise_id, level, sets, reps, rest) in id order
+        s = self.strings()
+        return [
+            (pk, exercise_id, s[level], sets, reps, rest)
+            for pk, exercise_id, level, sets, reps, rest in self.arrays["prescriptions"].tolist()
+        ]
+
+    def slot_rows(self):
+        # Ordered by (training_bracket, phase, slot_number)
+        text = self._text
+        return [
+            SlotRow(text(bracket), phase, number, text(pattern), text(base), text(progression), text(regression))
+            for bracket, phase, number, pattern, base, progression, regression in self.arrays["slots"].tolist()
+        ]
+
+
+def _stamp(st):
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+_open_files = {}
+_open_lock = threading.Lock()
+
+
+def snapshot_path():
+    return getattr(settings, "CATALOG_SNAPSHOT_PATH", "")
+
+
+def file_version(path=None):
+    """
+    Provider version for the snapshot file: ("file", path, stamp), or None when no
+    snapshot is configured or it doesn't exist yet (providers then read the DB).
+    One stat() call; a rename into place changes the inode, so it's seen immediately.
+    """
+    path = path or snapshot_path()
+    if not path:
+        return None
+    try:
+        return ("file", path, _stamp(os.stat(path)))
+    except FileNotFoundError:
+        return None
+
+
+def is_file_version(version):
+    return isinstance(version, tuple) and version[:1] == ("file",)
+
+
+def load(path):
+    """
+    The CatalogFile for `path`, shared by every provider in the process and re-opened
+    when the file on disk has been replaced.
+    """
+    stamp = _stamp(os.stat(path))
+    current = _open_files.get(path)
+    if current is not None and current.stamp == stamp:
+        return current
+    with _open_lock:
+        current = _open_files.get(path)
+        if current is None or current.stamp != stamp:
+            current = _open_files[path] = CatalogFile(path)
+    return current
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from ..metrics import registry
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU map for memoizing computed plans inside one process.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, builder):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = builder()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+class TieredCache:
+    """
+    A per-process LRUCache in front of a shared Django cache (CACHES[alias]).
+
+    get_or_set() looks in the LRU, then the shared cache, and only then builds. Builds are
+    single-flight: one thread per process (a per-key lock) and one process across the
+    workers (a cache.add() lock); the others wait for that result instead of computing
+    it again. Keys are tagged with version() (e.g. the catalog fingerprint), so moving
+    the version retires every entry at once. Lookups are counted by result in
+    gym_cache_requests_total.
+    """
+
+    def __init__(self, namespace, version=None, maxsize=None, timeout=None, alias="default"):
+        self.namespace = namespace
+        self.version = version
+        self.alias = alias
+        self.timeout = timeout if timeout is not None else settings.CACHE_DEFAULT_TIMEOUT
+        self.local = LRUCache(maxsize or settings.CACHE_LOCAL_MAXSIZE)
+        self._locks = {}  # full key -> Lock held while this process builds it
+        self._locks_guard = threading.Lock()
+
+    def make_key(self, key):
+        tag = self.version() if self.version else ""
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return f"tiered:{self.namespace}:{tag}:{digest}"
+
+    def get_or_set(self, key, builder):
+        full_key = self.make_key(key)
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self._count("local_hit")
+            return value
+
+        shared = caches[self.alias]
+        value = shared.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self._count("shared_hit")
+            self.local.set(full_key, value)
+            return value
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(full_key, threading.Lock())
+        with lock:
+            # Another thread may have finished it while we waited
+            value = self.local.get(full_key, _MISSING)
+            if value is not _MISSING:
+                self._count("local_hit")
+                return value
+            try:
+                value = self._build_once(shared, full_key, builder)
+                self.local.set(full_key, value)
+            finally:
+                with self._locks_guard:
+                    self._locks.pop(full_key, None)
+        return value
+
+    def _build_once(self, shared, full_key, builder):
+        lock_key = f"{full_key}:lock"
+        lock_timeout = settings.CACHE_LOCK_TIMEOUT
+        if shared.add(lock_key, os.getpid(), lock_timeout):
+            try:
+                return self._build(shared, full_key, builder)
+            finally:
+                shared.delete(lock_key)
+
+        # Another worker is building it: poll for its result rather than duplicating the work
+        deadline = time.monotonic() + lock_timeout
+        delay = 0.005
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            # Lock first: the builder stores the value before releasing it
+            building = shared.get(lock_key) is not None
+            value = shared.get(full_key, _MISSING)
+            if value is not _MISSING:
+                self._count("wait_hit")
+                return value
+            if not building:
+                break  # the builder gave up (error) without storing anything
+        return self._build(shared, full_key, builder)
+
+    def _build(self, shared, full_key, builder):
+        self._count("miss")
+        with registry.timer("gym_cache_build_duration_seconds", {"cache": self.namespace}):
+            value = builder()
+        shared.set(full_key, value, self.timeout)
+        return value
+
+    def _count(self, result):
+        registry.inc("gym_cache_requests_total", {"cache": self.namespace, "result": result})
+
+    def clear(self):
+        # Local tier only; shared entries retire when the version moves or they expire
+        self.local.clear()
+
+    def __len__(self):
+        return len(self.local)
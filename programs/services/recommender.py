@@ -1,56 +1,108 @@
 import random
-from ..models import Prescription, Exercise
+from django.utils import timezone
 from .age_logic import AgeLogic
+from .catalog import CatalogProvider, default_catalog
+from .memo import LRUCache, TieredCache
+from .seeding import plan_rng
 
 
 class WorkoutService:
     """
     Class-based workout service that uses AgeLogic class for mapping training_age -> level.
+    Reads exercises/prescriptions from the in-memory catalog snapshot instead of the DB.
     """
 
-    def __init__(self, age_logic: AgeLogic | None = None):
+    def __init__(
+        self,
+        age_logic: AgeLogic | None = None,
+        catalog: CatalogProvider | None = None,
+        memo: LRUCache | TieredCache | None = None,
+    ):
         # Accept an AgeLogic instance (useful for testing); create default if not provided.
         self.age_logic = age_logic or AgeLogic()
+        self.catalog = catalog or default_catalog
+        # Shared across workers; tagged with the catalog fingerprint so a catalog change retires it
+        self.memo = memo or TieredCache("daily-workouts", version=lambda: self.catalog.get().fingerprint, timeout=24 * 60 * 60)
 
     def get_category_options(self, category):
-        return Exercise.objects.filter(category=category)
+        return self.catalog.get().category_options(category)
 
     def get_exercise_plan(self, exercise_id, training_age):
         level = self.age_logic.get_level(training_age)
+        return self._plan_for(self.catalog.get(), exercise_id, level)
 
-        try:
-            prescription = Prescription.objects.get(
-                exercise_id=exercise_id,
-                level=level
-            )
-        except Prescription.DoesNotExist:
-            raise ValueError(
-                f"No prescription found for exercise id={exercise_id} and level={level}"
-            )
+    def daily_workout(self, categories, training_age, rng=None):
+        level = self.age_logic.get_level(training_age)
+        return self._workout_for(self.catalog.get(), categories, level, rng)
 
-        return {
-            "exercise": prescription.exercise.name,
-            "sets": prescription.sets,
-            "reps": prescription.reps,
-            "rest": prescription.rest,
-        }
+    def seeded_daily_workout(self, user_id, categories, training_age, day=None):
+        """
+        Reproducible daily_workout: derived from (user, day, level, categories, catalog
+        fingerprint) and memoized, so repeat calls on the same day return the same workout.
+        """
+        snapshot = self.catalog.get()
+        level = self.age_logic.get_level(training_age)
+        day = day or timezone.localdate()
+        key = ("daily", user_id, day.isoformat(), level, tuple(categories), snapshot.fingerprint)
+
+        return self.memo.get_or_set(
+            key, lambda: self._workout_for(snapshot, categories, level, plan_rng(*key))
+        )
+
+    def daily_workouts(self, requests):
+        """
+        Batch version of daily_workout for many (categories, training_age) pairs.
 
-    def daily_workout(self, categories, training_age):
+        Everything is answered from a single catalog snapshot, so a batch costs at most
+        the one query needed to (re)build it. Each result is either {"workout": [...]}
+        or {"detail": "..."} so one bad entry doesn't fail the whole batch.
+        """
+        snapshot = self.catalog.get()
+        levels = {}
+        results = []
+
+        for categories, training_age in requests:
+            if training_age not in levels:
+                levels[training_age] = self.age_logic.get_level(training_age)
+            try:
+                workout = self._workout_for(snapshot, categories, levels[training_age])
+            except ValueError as e:
+                results.append({"detail": str(e)})
+            else:
+                results.append({"workout": workout})
+
+        return results
+
+    def _workout_for(self, snapshot, categories, level, rng=None):
+        rng = rng or random
         workout = []
 
         for category in categories:
-            options = self.get_category_options(category)
+            options = snapshot.category_options(category)
 
-            if not options.exists():
+            if not options:
                 continue
 
-            exercise = random.choice(list(options))
+            exercise = rng.choice(options)
+            workout.append(self._plan_for(snapshot, exercise.id, level))
+
+        return workout
 
-            workout.append(
-                self.get_exercise_plan(
-                    exercise.id,
-                    training_age
-                )
+    def _plan_for(self, snapshot, exercise_id, level):
+        try:
+            exercise_id = int(exercise_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid exercise id={exercise_id!r}")
+
+        prescription = snapshot.prescription(exercise_id, level)
+        if prescription is None:
+            raise ValueError(
+                f"No prescription found for exercise id={exercise_id} and level={level}"
             )
 
-        return workout
\ No newline at end of file
+        return {
+            "exercise": prescription.exercise.name,
+            "sets": prescription.sets,
+            "reps": prescription.reps,
+            "rest": prescription.rest,
+        }
@@ -0,0 +1,72 @@
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from ..models import UserProfile, training_state
+from .slot_plans import SlotPlanService
+
+
+class ScheduleExporter:
+    """
+    Streams every member's current month, bracket, phase and 16-slot plan as NDJSON.
+
+    Profiles are read as tuples with .iterator(chunk_size) and each (bracket, phase) plan
+    is JSON-encoded once from the cached slot plans, so memory stays flat however many
+    members there are. Output comes in ~`buffer_size` byte pieces, gzip-compressed on
+    the fly if asked: chunks() for WSGI, achunks() for ASGI.
+    """
+
+    FIELDS = (
+        "user_id", "user__username", "training_age", "training_start_date",
+        "training_month", "training_bracket", "training_phase", "training_state_until",
+    )
+
+    def __init__(self, slot_plans: SlotPlanService | None = None, chunk_size=2000, buffer_size=64 * 1024):
+        self.slot_plans = slot_plans or SlotPlanService()
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+
+    def lines(self, today=None):
+        today = today or timezone.now().date()
+        exported_on = json.dumps(today.isoformat())
+        plans = {}  # (bracket, phase) -> encoded plan
+        rows = UserProfile.objects.order_by("pk").values_list(*self.FIELDS)
+        for user_id, username, training_age, start, month, bracket, phase, until in rows.iterator(chunk_size=self.chunk_size):
+            if until is None or until <= today:
+                # nightly refresh_training_state hasn't caught up with this member yet
+                state = training_state(training_age, start, today)
+                month, bracket, phase = state["training_month"], state["training_bracket"], state["training_phase"]
+            plan = plans.get((bracket, phase))
+            if plan is None:
+                plan = plans[(bracket, phase)] = json.dumps(self.slot_plans.schedule_plan(bracket, phase))
+            yield (
+                f'{{"user_id": {user_id}, "username": {json.dumps(username)}, "exported_on": {exported_on}, '
+                f'"training_age": {training_age}, "current_month": {month}, "bracket": {json.dumps(bracket)}, '
+                f'"phase": {phase}, "16_slot_plan": {plan}}}\n'
+            ).encode()
+
+    def chunks(self, gzip=False, today=None):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None  # wbits 31 = gzip container
+        buffer = bytearray()
+        for line in self.lines(today):
+            buffer += line
+            if len(buffer) >= self.buffer_size:
+                yield compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                buffer.clear()
+        if compressor:
+            yield compressor.compress(bytes(buffer)) + compressor.flush()
+        elif buffer:
+            yield bytes(buffer)
+
+    async def achunks(self, gzip=False, today=None):
+        # ASGI buffers a sync iterator whole; this hands each piece over as it's made. The
+        # generator (and its DB cursor) always advances on the same sync thread.
+        chunks = self.chunks(gzip, today)
+        advance = sync_to_async(next)
+        try:
+            while (piece := await advance(chunks, None)) is not None:
+                yield piece
+        finally:
+            await sync_to_async(chunks.close)()
@@ -1,7 +1,9 @@
 import random
-from ..models import Prescription, Exercise
 from .recommender import WorkoutService
 from .age_logic import AgeLogic
+from .catalog import CatalogProvider, default_catalog
+from .memo import LRUCache, TieredCache
+from .seeding import plan_rng, week_key
 
 
 class SchedulerService:
@@ -10,33 +12,52 @@ class SchedulerService:
     Produces a 4-day plan composed from up to 16 exercises for a training_age.
     """
 
-    def __init__(self, age_logic: AgeLogic | None = None, workout_service: WorkoutService | None = None):
+    def __init__(
+        self,
+        age_logic: AgeLogic | None = None,
+        workout_service: WorkoutService | None = None,
+        catalog: CatalogProvider | None = None,
+        memo: LRUCache | TieredCache | None = None,
+    ):
         self.age_logic = age_logic or AgeLogic()
-        self.workout_service = workout_service or WorkoutService(self.age_logic)
+        self.catalog = catalog or default_catalog
+        # Shared across workers; keys carry the level fingerprint, so only that level's catalog matters
+        self.memo = memo or TieredCache("weekly-plans", timeout=7 * 24 * 60 * 60)
+        self.workout_service = workout_service or WorkoutService(self.age_logic, self.catalog)
 
     def get_candidates_for_level(self, training_age):
         level = self.age_logic.get_level(training_age)
-        prescriptions = Prescription.objects.filter(level=level).select_related("exercise")
-        seen = set()
-        exercises = []
-        for p in prescriptions:
-            e = p.exercise
-            if e.id not in seen:
-                seen.add(e.id)
-                exercises.append((e, p))
-        return exercises
-
-    def select_16(self, exercises_with_pres):
+        # Snapshot already holds one (exercise, prescription) pair per exercise
+        return list(self.catalog.get().for_level(level))
+
+    def select_16(self, exercises_with_pres, rng=None):
+        rng = rng or random
         if len(exercises_with_pres) <= 16:
             return exercises_with_pres[:]
-        return random.sample(exercises_with_pres, 16)
+        return rng.sample(exercises_with_pres, 16)
+
+    def seeded_4_day_plan(self, user_id, training_age, day=None):
+        """
+        Reproducible build_4_day_plan for a user's week.
+
+        The plan is derived from (user, ISO week, level, level fingerprint) with its own
+        RNG and memoized, so it stays the same (and isn't recomputed) for the rest of the
+        week, and changes when the week or that level's part of the catalog does.
+        """
+        level = self.age_logic.get_level(training_age)
+        key = ("week", user_id, week_key(day), level, self.catalog.get().level_fingerprint(level))
+
+        return self.memo.get_or_set(
+            key, lambda: self.build_4_day_plan(training_age, rng=plan_rng(*key))
+        )
 
-    def build_4_day_plan(self, training_age):
+    def build_4_day_plan(self, training_age, rng=None):
+        rng = rng or random
         candidates = self.get_candidates_for_level(training_age)
         if not candidates:
             return [{"day": i + 1, "exercises": []} for i in range(4)]
 
-        selected = self.select_16(candidates)
+        selected = self.select_16(candidates, rng)
 
         plyo = [item for item in selected if item[0].kind == "plyo"]
         non_plyo = [item for item in selected if item[0].kind != "plyo"]
@@ -51,7 +72,7 @@ class SchedulerService:
 
         # Fill remaining slots aiming for 4 per day when possible
         remaining_slots = [4 - len(d) for d in days]
-        random.shuffle(non_plyo)
+        rng.shuffle(non_plyo)
         ni = 0
         for day_idx, slots in enumerate(remaining_slots):
             while slots > 0 and ni < len(non_plyo):
@@ -0,0 +1,22 @@
+import hashlib
+import random
+
+from django.utils import timezone
+
+
+def plan_rng(*parts):
+    """
+    Private random.Random seeded from `parts`. Same parts -> same sequence, in any
+    process, and no shared global RNG state between threads.
+    """
+    digest = hashlib.sha256(repr(parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def week_key(day=None):
+    """
+    ISO (year, week) for `day` (default: today), e.g. (2026, 42).
+    """
+    day = day or timezone.localdate()
+    year, week, _ = day.isocalendar()
+    return year, week
@@ -0,0 +1,109 @@
+from types import MappingProxyType
+
+from ..models import WorkoutSlotLogic
+from .age_logic import AgeLogic
+from . import catalog_file
+from .catalog import VersionedProvider, bump_version
+
+SLOT_PLAN_VERSION_KEY = "programs:slot-plan-version"
+
+
+def bump_slot_plan_version():
+    bump_version(SLOT_PLAN_VERSION_KEY)
+
+
+class SlotPlanSnapshot:
+    """
+    Every (training_bracket, phase) 16-slot plan, pre-serialized in the shapes the views return.
+
+    The lists are shared between requests: treat them as read-only.
+    """
+
+    def __init__(self, version, slots):
+        self.version = version
+
+        schedule = {}
+        options = {}
+        for s in slots:
+            key = (s.training_bracket, s.phase)
+            schedule.setdefault(key, []).append({
+                "slot_id": s.slot_number,
+                "pattern": s.movement_pattern,
+                "options": {
+                    "starting_exercise": s.base_exercise,
+                    "if_too_easy": s.progression_exercise,
+                    "if_too_hard": s.regression_exercise
+                }
+            })
+            options.setdefault(key, []).append({
+                "slot_id": s.slot_number,
+                "pattern": s.movement_pattern,
+                "options": {
+                    "base": s.base_exercise,
+                    "progression": s.progression_exercise,
+                    "regression": s.regression_exercise
+                }
+            })
+
+        self.schedule = MappingProxyType(schedule)
+        self.options = MappingProxyType(options)
+
+    def __reduce__(self):
+        # Pickled for the shared snapshot cache: back to slot rows, rebuilt on load
+        rows = [
+            catalog_file.SlotRow(
+                bracket, phase, slot["slot_id"], slot["pattern"], slot["options"]["starting_exercise"],
+                slot["options"]["if_too_easy"], slot["options"]["if_too_hard"],
+            )
+            for (bracket, phase), slots in self.schedule.items()
+            for slot in slots
+        ]
+        return SlotPlanSnapshot, (self.version, rows)
+
+    def keys(self):
+        return self.schedule.keys()
+
+
+class SlotPlanProvider(VersionedProvider):
+    """
+    Provider for the SlotPlanSnapshot; rebuilt in every process when bump_slot_plan_version()
+    (signals, SlotLogicLoader) moves the shared SnapshotVersion row.
+    """
+    version_key = SLOT_PLAN_VERSION_KEY
+    from_snapshot_file = True
+    shared = True
+
+    def build(self, version) -> SlotPlanSnapshot:
+        if catalog_file.is_file_version(version):
+            return SlotPlanSnapshot(version, catalog_file.load(version[1]).slot_rows())
+        slots = WorkoutSlotLogic.objects.order_by("training_bracket", "phase", "slot_number")
+        return SlotPlanSnapshot(version, slots)
+
+
+default_slot_plans = SlotPlanProvider()
+
+
+class SlotPlanService:
+    """
+    Resolves a profile's (bracket, phase) and returns the cached slot plan for it.
+    """
+
+    def __init__(self, age_logic: AgeLogic | None = None, provider: SlotPlanProvider | None = None):
+        self.age_logic = age_logic or AgeLogic()
+        self.provider = provider or default_slot_plans
+
+    def bracket_and_phase(self, training_age, training_month):
+        return self.age_logic.get_bracket(training_age), self.age_logic.get_phase(training_month)
+
+    def schedule_plan(self, bracket, phase):
+        # [] when no slots are loaded for this key
+        return self.provider.get().schedule.get((bracket, phase), [])
+
+    def options_plan(self, bracket, phase):
+        return self.provider.get().options.get((bracket, phase), [])
+
+    async def aschedule_plan(self, bracket, phase):
+        return (await self.provider.aget()).schedule.get((bracket, phase), [])
+
+    async def aoptions_plan(self, bracket, phase):
+        return (await self.provider.aget()).options.get((bracket, phase), [])
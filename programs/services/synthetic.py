@@ -0,0 +1,159 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import Exercise, Prescription, UserProfile, WorkoutSlotLogic, training_state
+from .catalog import bump_catalog_version
+from .slot_plans import bump_slot_plan_version
+
+CATEGORIES = [c for c, _ in Exercise.CATEGORY_CHOICES]
+KINDS = [k for k, _ in Exercise.KIND_CHOICES]
+LEVELS = [l for l, _ in Prescription.LEVEL_CHOICES]
+BRACKETS = ("0-1", "2-4", "5+")
+PATTERNS = (
+    "UPPER PUSH HOR", "UPPER PULL HOR", "UPPER PUSH VERT", "UPPER PULL VERT",
+    "LOWER PUSH", "LOWER PULL (HIP)", "LOWER PULL KNEE", "CORE",
+    "OLYMPIC", "MEDICINE BALL", "WARMUP 1", "WARMUP 2", "WARMUP 3", "WARMUP 4", "SPEED", "FINISHER",
+)
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class SyntheticData:
+    """
+    Generates catalog and member rows at scale for benchmarks and load testing.
+
+    Rows are produced lazily and written with bulk_create in batches, so memory stays
+    flat however many are requested. Everything derives from `seed`, and names carry
+    `prefix` so runs don't collide with real data.
+    """
+
+    def __init__(self, seed=0, batch_size=5000, prefix="syn", max_training_months=36):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.max_training_months = max_training_months
+        self.today = timezone.localdate()
+
+    # --- catalog ---
+
+    def iter_exercises(self, count, start=0):
+        for i in range(start, start + count):
+            yield Exercise(
+                name=f"{self.prefix.upper()} EXERCISE {i:07d}",
+                slug=f"{self.prefix}-exercise-{i:07d}",
+                category=self.rng.choice(CATEGORIES),
+                kind=self.rng.choice(KINDS),
+            )
+
+    def create_exercises(self, count, start=0):
+        for chunk in chunked(self.iter_exercises(count, start), self.batch_size):
+            Exercise.objects.bulk_create(chunk)
+        bump_catalog_version()
+        return count
+
+    def iter_prescriptions(self, exercise_ids, coverage=1.0):
+        for exercise_id in exercise_ids:
+            for level_idx, level in enumerate(LEVELS):
+                if self.rng.random() > coverage:
+                    continue
+                yield Prescription(
+                    exercise_id=exercise_id,
+                    level=level,
+                    sets=self.rng.randint(1, 3) + level_idx,
+                    reps=self.rng.choice((5, 8, 10, 12, 15, 20)),
+                    rest=self.rng.choice((30, 45, 60, 90, 120)),
+                )
+
+    def create_prescriptions(self, coverage=1.0):
+        """
+        Prescriptions for every synthetic exercise at each level (with probability `coverage`).
+        """
+        ids = Exercise.objects.filter(slug__startswith=f"{self.prefix}-").values_list("id", flat=True)
+        created = 0
+        for chunk in chunked(self.iter_prescriptions(ids.iterator(chunk_size=self.batch_size), coverage), self.batch_size):
+            Prescription.objects.bulk_create(chunk, ignore_conflicts=True)
+            created += len(chunk)
+        bump_catalog_version()
+        return created
+
+    def iter_slots(self, phases):
+        for bracket in BRACKETS:
+            for phase in range(1, phases + 1):
+                for slot, pattern in enumerate(PATTERNS, start=1):
+                    yield WorkoutSlotLogic(
+                        training_bracket=bracket,
+                        phase=phase,
+                        slot_number=slot,
+                        movement_pattern=pattern,
+                        base_exercise=f"{pattern} BASE {phase}",
+                        progression_exercise=f"{pattern} PROGRESSION {phase}",
+                        regression_exercise=f"{pattern} REGRESSION {phase}",
+                    )
+
+    def create_slots(self, phases=2):
+        created = 0
+        for chunk in chunked(self.iter_slots(phases), self.batch_size):
+            WorkoutSlotLogic.objects.bulk_create(chunk, ignore_conflicts=True)
+            created += len(chunk)
+        bump_slot_plan_version()
+        return created
+
+    # --- members ---
+
+    def profile_fields(self):
+        """
+        Start dates spread over the last `max_training_months`; training_age roughly
+        follows time trained (in years) with some members re-assessed up or down.
+        Includes the materialized training_* fields.
+        """
+        days = self.rng.randint(0, self.max_training_months * 30)
+        training_age = max(0, min(10, days // 365 + self.rng.choice((-1, 0, 0, 0, 1, 2))))
+        start = self.today - timedelta(days=days)
+        return {
+            "training_start_date": start,
+            "training_age": training_age,
+            # bulk_create skips UserProfile.save(), so fill the materialized fields here
+            **training_state(training_age, start, self.today),
+        }
+
+    def create_users(self, count, password="synthetic-pass", start=0, progress=None):
+        """
+        Users plus their profiles, both via bulk_create. That skips the per-row post_save
+        that creates profiles in programs/signals.py (one extra INSERT per user), so
+        profiles are bulk-created here instead. The password is hashed once and shared
+        by every synthetic user. `progress(created)` is called after each batch.
+        """
+        hashed = make_password(password)
+        returns_ids = connection.features.can_return_rows_from_bulk_insert
+        created = 0
+        for chunk in chunked(range(start, start + count), self.batch_size):
+            usernames = [f"{self.prefix}_user_{i:08d}" for i in chunk]
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=u, email=f"{u}@example.com", password=hashed) for u in usernames
+                ])
+                if returns_ids:
+                    ids = [u.pk for u in users]
+                else:
+                    ids = User.objects.filter(username__in=usernames).values_list("id", flat=True)
+                UserProfile.objects.bulk_create([
+                    UserProfile(user_id=user_id, is_verified=True, **self.profile_fields()) for user_id in ids
+                ])
+            created += len(chunk)
+            if progress:
+                progress(created)
+        return created
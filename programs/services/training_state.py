@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import TRAINING_STATE_FIELDS, UserProfile, WeeklyPlanDirty
+from .weekly_plans import mark_dirty
+
+
+class TrainingStateRefresher:
+    """
+    Recomputes the materialized training_* columns on UserProfile, touching only profiles
+    whose training_state_until has passed (or was never set).
+
+    Walks them in primary-key order `batch_size` at a time and writes each batch with one
+    bulk_update in its own transaction, so memory stays flat and a run can be interrupted.
+    Members whose phase rolled over are queued for a new weekly plan.
+    """
+
+    def __init__(self, batch_size=2000):
+        self.batch_size = batch_size
+
+    def refresh(self, today=None, progress=None):
+        """
+        Returns (scanned, updated). `progress(scanned, updated)` is called after each batch.
+        """
+        today = today or timezone.now().date()
+        stale = (
+            UserProfile.objects.stale_training_state(today)
+            .only("id", "user_id", "training_age", "training_start_date", *TRAINING_STATE_FIELDS)
+            .order_by("pk")
+        )
+        scanned = updated = 0
+        last_pk = 0
+        while True:
+            batch = list(stale.filter(pk__gt=last_pk)[:self.batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            phases = {p.pk: p.training_phase for p in batch}
+            changed = [p for p in batch if p.refresh_training_state(today)]
+            if changed:
+                with transaction.atomic():
+                    UserProfile.objects.bulk_update(changed, TRAINING_STATE_FIELDS)
+                    mark_dirty(
+                        [p.user_id for p in changed if p.training_phase != phases[p.pk]],
+                        WeeklyPlanDirty.REASON_PHASE,
+                    )
+            scanned += len(batch)
+            updated += len(changed)
+            if progress:
+                progress(scanned, updated)
+        return scanned, updated
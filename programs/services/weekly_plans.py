@@ -0,0 +1,172 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import TRAINING_STATE_FIELDS, Prescription, UserProfile, WeeklyPlan, WeeklyPlanDirty
+from .age_logic import AgeLogic
+from .scheduler import SchedulerService
+from .slot_plans import SlotPlanService
+from .synthetic import chunked
+
+PLAN_FIELDS = ["training_age", "level", "training_bracket", "phase", "training_month", "level_fingerprint", "days", "generated_at"]
+
+
+def week_start(day=None):
+    day = day or timezone.localdate()
+    return day - timedelta(days=day.weekday())
+
+
+def mark_dirty(user_ids, reason, batch_size=1000):
+    """
+    Queue users for regeneration by refresh_weekly_plans. Already-queued users are left as they are.
+    """
+    for chunk in chunked(user_ids, batch_size):
+        WeeklyPlanDirty.objects.bulk_create(
+            [WeeklyPlanDirty(user_id=user_id, reason=reason) for user_id in chunk], ignore_conflicts=True
+        )
+
+
+class WeeklyPlanService:
+    """
+    Persists each member's seeded 4-day plan per week in WeeklyPlan.
+
+    Reads are one indexed lookup on (user, week_start). A row is only trusted while its
+    training age, level, bracket, phase and level fingerprint match the member's current state and
+    catalog; otherwise it is rebuilt inline. The dirty queue lets refresh_weekly_plans
+    do that rebuilding ahead of time, for just the members whose inputs changed.
+    """
+
+    def __init__(self, age_logic=None, scheduler=None, slot_plans=None, batch_size=1000):
+        self.age_logic = age_logic or AgeLogic()
+        self.scheduler = scheduler or SchedulerService(self.age_logic)
+        self.slot_plans = slot_plans or SlotPlanService(self.age_logic)
+        self.batch_size = batch_size
+
+    # --- read path ---
+
+    def for_user(self, user_id, profile, day=None):
+        day = day or timezone.localdate()
+        month, bracket, phase = profile.current_training_state(day)
+        plan = WeeklyPlan.objects.filter(user_id=user_id, week_start=week_start(day)).first()
+        if plan is None or not self.is_current(plan, profile.training_age, bracket, phase):
+            plan = self.build(user_id, profile.training_age, month, bracket, phase, day)
+            self.save([plan])
+        return plan
+
+    def is_current(self, plan, training_age, bracket, phase):
+        level = self.age_logic.get_level(training_age)
+        return (
+            plan.training_age == training_age
+            and plan.level == level
+            and plan.training_bracket == bracket
+            and plan.phase == phase
+            and plan.level_fingerprint == self.scheduler.catalog.get().level_fingerprint(level)
+        )
+
+    def payload(self, plan):
+        return {
+            "week_start": plan.week_start,
+            "training_age": plan.training_age,
+            "current_month": plan.training_month,
+            "bracket": plan.training_bracket,
+            "phase": plan.phase,
+            "4_day_plan": plan.days,
+            "16_slot_plan": self.slot_plans.schedule_plan(plan.training_bracket, plan.phase),
+        }
+
+    # --- write path ---
+
+    def build(self, user_id, training_age, month, bracket, phase, day=None):
+        day = day or timezone.localdate()
+        level = self.age_logic.get_level(training_age)
+        return WeeklyPlan(
+            user_id=user_id,
+            week_start=week_start(day),
+            training_age=training_age,
+            level=level,
+            training_bracket=bracket,
+            phase=phase,
+            training_month=month,
+            level_fingerprint=self.scheduler.catalog.get().level_fingerprint(level),
+            days=self.scheduler.seeded_4_day_plan(user_id, training_age, day),
+            generated_at=timezone.now(),
+        )
+
+    def save(self, plans):
+        WeeklyPlan.objects.bulk_create(
+            plans, update_conflicts=True, unique_fields=["user", "week_start"], update_fields=PLAN_FIELDS
+        )
+
+    def build_for_profiles(self, profiles, day=None):
+        plans = []
+        for profile in profiles:
+            month, bracket, phase = profile.current_training_state(day)
+            plans.append(self.build(profile.user_id, profile.training_age, month, bracket, phase, day))
+        self.save(plans)
+        return len(plans)
+
+    def _profiles(self):
+        return UserProfile.objects.only("user_id", "training_age", "training_start_date", *TRAINING_STATE_FIELDS)
+
+    # --- incremental refresh ---
+
+    def mark_stale_levels(self, day=None):
+        """
+        Queue members whose plan for this week was built from an older catalog for their level.
+        """
+        snapshot = self.scheduler.catalog.get()
+        queued = 0
+        for level, _ in Prescription.LEVEL_CHOICES:
+            stale = (
+                WeeklyPlan.objects.filter(week_start=week_start(day), level=level)
+                .exclude(level_fingerprint=snapshot.level_fingerprint(level))
+                .values_list("user_id", flat=True)
+            )
+            for chunk in chunked(stale.iterator(chunk_size=self.batch_size), self.batch_size):
+                mark_dirty(chunk, WeeklyPlanDirty.REASON_CATALOG, self.batch_size)
+                queued += len(chunk)
+        return queued
+
+    def refresh_dirty(self, day=None, progress=None):
+        """
+        Drain the dirty queue: rebuild and upsert each queued member's plan for this week,
+        a batch at a time. Returns the number of plans written.
+        """
+        written = 0
+        last_pk = 0
+        while True:
+            user_ids = list(
+                WeeklyPlanDirty.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:self.batch_size]
+            )
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+            with transaction.atomic():
+                written += self.build_for_profiles(self._profiles().filter(user_id__in=user_ids), day)
+                WeeklyPlanDirty.objects.filter(pk__in=user_ids).delete()
+            if progress:
+                progress(written)
+        return written
+
+    def fill_week(self, day=None, progress=None):
+        """
+        Build this week's plan for every member who doesn't have one yet.
+        """
+        missing = self._profiles().exclude(user__weekly_plans__week_start=week_start(day)).order_by("pk")
+        written = 0
+        last_pk = 0
+        while True:
+            batch = list(missing.filter(pk__gt=last_pk)[:self.batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            written += self.build_for_profiles(batch, day)
+            if progress:
+                progress(written)
+        return written
+
+    def prune(self, keep_weeks, day=None):
+        cutoff = week_start(day) - timedelta(weeks=keep_weeks)
+        deleted, _ = WeeklyPlan.objects.filter(week_start__lt=cutoff).delete()
+        return deleted
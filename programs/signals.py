@@ -1,9 +1,38 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Exercise, Prescription, WorkoutSlotLogic
+from .auth import invalidate_claims
+from .services.catalog import bump_catalog_version
+from .services.slot_plans import bump_slot_plan_version
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        UserProfile.objects.create(user=instance)
+
+# Fields that never end up in token claims; saves touching only these keep tokens valid
+UNCLAIMED_FIELDS = {"last_login", "password", "otp"}
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserProfile)
+def invalidate_token_claims(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= UNCLAIMED_FIELDS):
+        return
+    invalidate_claims(instance.pk if sender is User else instance.user_id)
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_deleted_claims(sender, instance, **kwargs):
+    # Tokens of a deleted user must hit the DB (and fail) instead of being trusted
+    invalidate_claims(instance.pk if sender is User else instance.user_id)
+
+@receiver([post_save, post_delete], sender=Exercise)
+@receiver([post_save, post_delete], sender=Prescription)
+def invalidate_catalog(sender, **kwargs):
+    # Any catalog edit (admin, loaders, shell) makes every worker rebuild its snapshot
+    bump_catalog_version()
+
+@receiver([post_save, post_delete], sender=WorkoutSlotLogic)
+def invalidate_slot_plans(sender, **kwargs):
+    bump_slot_plan_version()
@@ -0,0 +1,92 @@
+# programs/testing.py
+#
+# Local stand-ins for external services, for tests and local runs.
+
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _BrevoHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests.append({
+                "path": self.path,
+                "api_key": self.headers.get("api-key"),
+                "json": json.loads(body or b"{}"),
+            })
+            status = self.server.fail_next.pop(0) if self.server.fail_next else 201
+
+        payload = json.dumps({"messageId": f"<{uuid.uuid4().hex}@fake-brevo>"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBrevoServer:
+    """
+    Minimal HTTP server that accepts Brevo transactional-email calls and records them.
+
+        with FakeBrevoServer() as brevo, override_settings(BREVO_API_HOST=brevo.url):
+            send_brevo_email(...)
+        brevo.requests     # recorded JSON bodies
+        brevo.connections  # TCP connections opened (1 when the client reuses its pool)
+
+    Append HTTP status codes to `fail_next` to make the next calls fail.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), _BrevoHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = []
+        self.httpd.connections = 0
+        self.httpd.fail_next = []
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    @property
+    def fail_next(self):
+        return self.httpd.fail_next
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
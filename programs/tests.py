@@ -1,3 +1,447 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth.models import Permission, User
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .auth import CLAIMS_STAMP_KEY, ClaimsJWTAuthentication, ClaimsUser, issue_tokens, last_login_buffer, record_login
+from .db_router import ReplicaRouter, record_write, replica_reads
+from .emails import send_brevo_bulk
+from .middleware import ReplicaStickinessMiddleware
+from .models import EmailOutbox, Exercise, Prescription, UserProfile, WeeklyPlanDirty, WorkoutSlotLogic
+from .outbox import BrevoTransport, EmailDeliveryError, MemoryTransport, OutboxWorker, enqueue_email
+from .profiling import list_captures
+from .services.age_logic import AgeLogic
+from .services.book_loader import SlotLogicLoader
+from .services.catalog import CatalogProvider, current_version
+from .services.memo import TieredCache
+from .services.slot_plans import SLOT_PLAN_VERSION_KEY, SlotPlanProvider
+from .services.training_age_bulk import TrainingAgeBulkUpdater
+from .testing import FakeBrevoServer
+
+
+def _user(username, training_age=2, **extra):
+    user = User.objects.create_user(username, f"{username}@example.com", "pw12345!", **extra)
+    UserProfile.objects.filter(user=user).update(training_age=training_age, training_start_date=date(2025, 1, 1))
+    return User.objects.select_related("profile").get(pk=user.pk)
+
+
+# --- email outbox ---
+
+class FailingTransport:
+    def send(self, message):
+        raise EmailDeliveryError("provider down")
+
+
+class OutboxWorkerTests(TestCase):
+    def setUp(self):
+        MemoryTransport.outbox.clear()
+
+    def worker(self, transport=None, **kwargs):
+        worker = OutboxWorker(transport=transport or MemoryTransport(), concurrency=2, **kwargs)
+        self.addCleanup(worker.shutdown)
+        return worker
+
+    def test_identical_pending_email_is_queued_once(self):
+        first = enqueue_email("Hi", "emails/otp_email.html", {"otp": "1"}, "a@example.com")
+        second = enqueue_email("Hi", "emails/otp_email.html", {"otp": "1"}, "a@example.com")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_claimed_rows_are_not_claimed_again_until_the_lease_expires(self):
+        enqueue_email("Hi", "emails/otp_email.html", {"otp": "1"}, "a@example.com")
+        first, second = self.worker(lease_seconds=60), self.worker(lease_seconds=60)
+
+        claimed = first.claim()
+        self.assertEqual([m.status for m in claimed], [EmailOutbox.STATUS_SENDING])
+        self.assertEqual(second.claim(), [])
+
+        # The first worker died mid-send: once the lease is over the row is re-claimed
+        EmailOutbox.objects.update(claimed_at=timezone.now() - timedelta(seconds=61))
+        reclaimed = second.claim()
+        self.assertEqual([m.pk for m in reclaimed], [claimed[0].pk])
+        self.assertNotEqual(reclaimed[0].claimed_by, claimed[0].claimed_by)
+
+    def test_sends_through_the_transport(self):
+        enqueue_email("Hi", "emails/otp_email.html", {"otp": "1"}, "a@example.com")
+        self.assertEqual(self.worker().run_once(), (1, 0, 0))
+        self.assertEqual(MemoryTransport.outbox[0]["to"], "a@example.com")
+        message = EmailOutbox.objects.get()
+        self.assertEqual((message.status, message.attempts, message.claimed_by), (EmailOutbox.STATUS_SENT, 1, None))
+
+    def test_failures_back_off_then_give_up(self):
+        enqueue_email("Hi", "emails/otp_email.html", {"otp": "1"}, "a@example.com")
+        worker = self.worker(FailingTransport(), max_attempts=2, backoff_base=30)
+
+        self.assertEqual(worker.run_once(), (0, 1, 0))
+        message = EmailOutbox.objects.get()
+        self.assertEqual((message.status, message.last_error), (EmailOutbox.STATUS_PENDING, "provider down"))
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(worker.run_once(), (0, 0, 0))  # not due yet
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(worker.run_once(), (0, 0, 1))
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_FAILED)
+
+
+class BrevoTests(TestCase):
+    def test_rejected_send_is_retried(self):
+        enqueue_email("Reset", "emails/reset_password.html", {"username": "a", "reset_link": "x"}, "a@example.com")
+        with FakeBrevoServer() as brevo, override_settings(BREVO_API_HOST=brevo.url, BREVO_API_KEY="test-key"):
+            brevo.fail_next.append(500)
+            worker = OutboxWorker(transport=BrevoTransport(), concurrency=1)
+            self.addCleanup(worker.shutdown)
+            self.assertEqual(worker.run_once(), (0, 1, 0))
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(worker.run_once(), (1, 0, 0))
+
+        self.assertEqual(len(brevo.requests), 2)
+        self.assertEqual(brevo.requests[-1]["api_key"], "test-key")
+        self.assertEqual(brevo.requests[-1]["json"]["to"], [{"email": "a@example.com"}])
+
+    def test_bulk_batches_recipients_over_one_connection(self):
+        recipients = [(f"u{i}@example.com", {"username": f"u{i}", "otp": str(i)}) for i in range(5)]
+        with FakeBrevoServer() as brevo, override_settings(BREVO_API_HOST=brevo.url, BREVO_API_KEY="test-key"):
+            accepted = send_brevo_bulk("OTP", "emails/otp_email.html", recipients, batch_size=2)
+
+        self.assertEqual(accepted, 5)
+        self.assertEqual([len(r["json"]["messageVersions"]) for r in brevo.requests], [2, 2, 1])
+        self.assertEqual(brevo.requests[0]["json"]["messageVersions"][1]["params"], {"otp": "1", "username": "u1"})
+        self.assertEqual(brevo.connections, 1)
+
+
+# --- token claims ---
+
+@override_settings(JWT_CLAIMS_AUTH=True)
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = _user("member", is_staff=True)
+
+    def authenticate(self, user=None):
+        token = issue_tokens(user or self.user).access_token
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        with CaptureQueriesContext(connection) as queries:
+            authenticated, _ = ClaimsJWTAuthentication().authenticate(request)
+        return authenticated, len(queries)
+
+    def test_fresh_token_is_trusted_without_queries(self):
+        user, queries = self.authenticate()
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual((user.id, user.profile.training_age, queries), (self.user.pk, 2, 0))
+
+    def test_claims_never_grant_staff(self):
+        user, _ = self.authenticate()
+        self.assertFalse(user.is_staff or user.is_superuser)
+
+    def test_profile_change_invalidates_issued_tokens(self):
+        token = issue_tokens(self.user).access_token
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.dob = date(1990, 1, 1)
+            self.user.profile.save()
+
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        user, _ = ClaimsJWTAuthentication().authenticate(request)
+        self.assertIsInstance(user, User)
+        # A new login gets a token that is trusted again
+        self.assertIsInstance(self.authenticate()[0], ClaimsUser)
+
+    def test_missing_stamp_falls_back_to_the_db(self):
+        token = issue_tokens(self.user).access_token
+        cache.delete(CLAIMS_STAMP_KEY.format(self.user.pk))
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        user, _ = ClaimsJWTAuthentication().authenticate(request)
+        self.assertIsInstance(user, User)
+
+    def test_deleted_user_is_rejected(self):
+        token = issue_tokens(self.user).access_token
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        response = self.client.get("/api/my-week/", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(JWT_CLAIMS_AUTH=False)
+    def test_disabled_means_plain_jwt(self):
+        self.assertIsInstance(self.authenticate()[0], User)
+
+
+class LastLoginTests(TestCase):
+    def test_immediate_by_default(self):
+        user = _user("member")
+        record_login(user)
+        self.assertIsNotNone(User.objects.get(pk=user.pk).last_login)
+
+
+@override_settings(LAST_LOGIN_MODE="deferred", LAST_LOGIN_FLUSH_INTERVAL=0.05)
+class DeferredLastLoginTests(TransactionTestCase):
+    # The timer flushes from its own thread and connection, outside any test transaction
+
+    def test_idle_worker_flushes_on_a_timer(self):
+        user = User.objects.create_user("member")
+        record_login(user)
+        self.assertIsNone(User.objects.get(pk=user.pk).last_login)
+
+        deadline = time.monotonic() + 5
+        while User.objects.get(pk=user.pk).last_login is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertIsNotNone(User.objects.get(pk=user.pk).last_login)
+        self.assertEqual(len(last_login_buffer), 0)
+
+
+# --- catalog loading ---
+
+class SlotLogicLoaderTests(TestCase):
+    def row(self, slot, base, pattern="UPPER PUSH HOR", phase=1):
+        return {
+            "training_bracket": "0-1", "phase": phase, "slot_number": slot, "movement_pattern": pattern,
+            "base_exercise": base, "progression_exercise": None, "regression_exercise": None,
+        }
+
+    def setUp(self):
+        self.loader = SlotLogicLoader()
+        self.loader.load([self.row(1, "PUSH UP"), self.row(2, "ROW"), self.row(3, "SQUAT")])
+
+    def stored(self):
+        return dict(WorkoutSlotLogic.objects.values_list("slot_number", "base_exercise"))
+
+    def test_diff_classifies_rows(self):
+        rows = [self.row(1, "PUSH UP"), self.row(2, "INVERTED ROW"), self.row(4, "LUNGE")]
+        result = self.loader.diff(rows, self.loader.existing())
+        self.assertEqual((len(result.create), len(result.update), len(result.delete), result.unchanged), (1, 1, 1, 1))
+        self.assertEqual(result.changed_fields[("0-1", 1, 2)], [("base_exercise", "ROW", "INVERTED ROW")])
+
+    def test_load_upserts_prunes_and_bumps_the_version(self):
+        before = current_version(SLOT_PLAN_VERSION_KEY)
+        result = self.loader.load([self.row(1, "PUSH UP"), self.row(2, "INVERTED ROW"), self.row(4, "LUNGE")])
+        self.assertEqual(self.stored(), {1: "PUSH UP", 2: "INVERTED ROW", 4: "LUNGE"})
+        self.assertEqual(result.exercises_created, 2)  # INVERTED ROW, LUNGE
+        self.assertNotEqual(current_version(SLOT_PLAN_VERSION_KEY), before)
+
+    def test_prune_is_one_delete_and_one_version_bump(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result = self.loader.load([self.row(1, "PUSH UP")])
+        self.assertEqual(len(result.delete), 2)
+        self.assertEqual(self.stored(), {1: "PUSH UP"})
+        sql = [q["sql"].upper() for q in ctx.captured_queries]
+        self.assertEqual(sum(s.startswith("DELETE") and "WORKOUTSLOTLOGIC" in s for s in sql), 1)
+        self.assertEqual(sum(s.startswith("UPDATE") and "SNAPSHOTVERSION" in s for s in sql), 1)
+
+    def test_dry_run_and_no_prune(self):
+        self.loader.load([self.row(2, "INVERTED ROW")], dry_run=True)
+        self.assertEqual(self.stored(), {1: "PUSH UP", 2: "ROW", 3: "SQUAT"})
+        self.loader.load([self.row(2, "INVERTED ROW")], prune=False)
+        self.assertEqual(self.stored(), {1: "PUSH UP", 2: "INVERTED ROW", 3: "SQUAT"})
+
+    def test_new_exercises_get_valid_types_and_existing_names_are_not_counted(self):
+        Exercise.objects.create(name="BOX JUMP", slug="box-jump-legacy", category="cardio", kind="plyo")
+        result = self.loader.load([self.row(1, "BOX JUMP", "SPEED"), self.row(2, "WORLD'S GREATEST", "WARMUP 1")])
+        self.assertEqual(result.exercises_created, 1)
+        created = Exercise.objects.get(name="WORLD'S GREATEST")
+        self.assertEqual((created.category, created.kind), ("flexibility", "mobility"))
+
+
+# --- bulk training age ---
+
+class TrainingAgeBulkUpdaterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.a, self.b = _user("a", training_age=2), _user("b", training_age=5)
+        self.rows = [
+            (2, {"username": "a", "training_age": "3"}),
+            (3, {"username": "b", "training_age": 5}),
+            (4, {"username": "nobody", "training_age": 1}),
+            (5, {"username": "a", "training_age": "x"}),
+        ]
+
+    def test_applies_changes_and_reports_each_row(self):
+        issue_tokens(self.a)
+        with self.captureOnCommitCallbacks(execute=True):
+            report = TrainingAgeBulkUpdater(batch_size=2).run(self.rows)
+
+        self.assertEqual((report.updated, report.unchanged, report.not_found, report.invalid), (1, 1, 1, 1))
+        self.assertEqual([r["status"] for r in report.results], ["updated", "unchanged", "not_found", "invalid"])
+        profile = UserProfile.objects.get(user=self.a)
+        self.assertEqual((profile.training_age, profile.training_level), (3, AgeLogic().get_level(3)))
+        self.assertEqual(list(WeeklyPlanDirty.objects.values_list("pk", flat=True)), [self.a.pk])
+        # queryset updates skip signals; the updater invalidates the claims itself
+        self.assertGreater(cache.get(CLAIMS_STAMP_KEY.format(self.a.pk)), time.time() - 5)
+        self.assertIsNone(cache.get(CLAIMS_STAMP_KEY.format(self.b.pk)))
+
+    def test_dry_run_changes_nothing(self):
+        report = TrainingAgeBulkUpdater().run(self.rows, dry_run=True)
+        self.assertEqual(report.updated, 1)
+        self.assertEqual(UserProfile.objects.get(user=self.a).training_age, 2)
+        self.assertFalse(WeeklyPlanDirty.objects.exists())
+
+
+# --- read replicas ---
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_STICKY_COOKIE="db_primary", REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def read_alias(self):
+        return self.router.db_for_read(Exercise)
+
+    def test_replicas_only_inside_requests_and_for_listed_models(self):
+        self.assertIsNone(self.read_alias())
+        with replica_reads():
+            self.assertEqual(self.read_alias(), "replica")
+            self.assertIsNone(self.router.db_for_read(EmailOutbox))
+
+    def test_a_write_pins_the_rest_of_the_request(self):
+        with replica_reads():
+            self.router.db_for_write(Exercise)
+            self.assertIsNone(self.read_alias())
+        with replica_reads(pinned=True):
+            self.assertIsNone(self.read_alias())
+
+    def test_middleware_keeps_a_writing_client_on_the_primary(self):
+        reads = []
+
+        def view(request):
+            reads.append(self.read_alias())
+            if request.method == "POST":
+                record_write()
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        factory = RequestFactory()
+
+        middleware(factory.get("/"))
+        response = middleware(factory.post("/"))
+        self.assertEqual(response.cookies["db_primary"]["max-age"], 5)
+        middleware(factory.get("/", HTTP_COOKIE="db_primary=1"))
+        self.assertEqual(reads, ["replica", None, None])
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class SnapshotReplicaTests(TransactionTestCase):
+    # Not a TestCase: inside its transaction every read goes to the primary anyway.
+    # "__all__" picks up the replica alias, which only exists once setUpClass adds it.
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        fd, cls.replica_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        connections.settings["replica"] = {**connections.settings[DEFAULT_DB_ALIAS], "NAME": cls.replica_path}
+        with connections["replica"].schema_editor() as editor:
+            # content types / permissions too: the flush between tests recreates them
+            for model in (ContentType, Permission, Exercise, Prescription, WorkoutSlotLogic):
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        os.unlink(cls.replica_path)
+
+    def setUp(self):
+        cache.clear()
+        # The replica lags behind: it still has the rows from before the last load
+        Exercise.objects.using("replica").create(name="OLD MOVE", slug="old-move", category="strength")
+        WorkoutSlotLogic.objects.using("replica").create(
+            training_bracket="0-1", phase=1, slot_number=1, movement_pattern="CORE", base_exercise="OLD MOVE",
+        )
+        Exercise.objects.create(name="NEW MOVE", slug="new-move", category="strength")
+        WorkoutSlotLogic.objects.create(
+            training_bracket="0-1", phase=1, slot_number=1, movement_pattern="CORE", base_exercise="NEW MOVE",
+        )
+
+    def test_snapshots_are_built_from_the_primary_during_replica_reads(self):
+        with replica_reads():
+            self.assertEqual(WorkoutSlotLogic.objects.get().base_exercise, "OLD MOVE")  # routing is live
+            slot_plans = SlotPlanProvider().get()
+            catalog = CatalogProvider().get()
+
+        self.assertEqual(slot_plans.schedule[("0-1", 1)][0]["options"]["starting_exercise"], "NEW MOVE")
+        names = {e.name for e in catalog.exercises.values()}
+        self.assertIn("NEW MOVE", names)
+        self.assertNotIn("OLD MOVE", names)
+
+
+# --- profiling ---
+
+class ProfilingCaptureTests(TestCase):
+    def test_captures_do_not_record_link_tokens_or_query_strings(self):
+        admin = _user("admin", is_staff=True)
+        uid = urlsafe_base64_encode(force_bytes(admin.pk))
+        token = default_token_generator.make_token(admin)
+        access = issue_tokens(admin).access_token
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILING_DIR=directory):
+            response = self.client.get(
+                f"/api/verify-reset-link/{uid}/{token}/?profile=1&note=secret-note",
+                headers={"Authorization": f"Bearer {access}"},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("X-Profile-Id", response.headers)
+            captured = "".join(p.read_text() for p in Path(directory).glob("*.json"))
+            listed = list_captures()
+
+        self.assertEqual(listed[0]["path"], "/api/verify-reset-link/<uidb64>/<token>/")
+        self.assertNotIn(token, captured)
+        self.assertNotIn("secret-note", captured)
+
+
+# --- tiered cache ---
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_build_once(self):
+        tiered = TieredCache("test-threads")
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"plan": 1}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(tiered.get_or_set("k", build))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"plan": 1}] * 8)
+
+    def test_waits_for_another_process_building_the_same_key(self):
+        tiered = TieredCache("test-processes")
+        full_key = tiered.make_key("k")
+        # Another worker holds the build lock and stores its result shortly after
+        cache.add(f"{full_key}:lock", 1, 5)
+        threading.Timer(0.05, lambda: cache.set(full_key, "from-other-worker")).start()
+
+        self.assertEqual(tiered.get_or_set("k", lambda: self.fail("built twice")), "from-other-worker")
+
+    def test_other_processes_reuse_the_shared_tier(self):
+        first, second = TieredCache("test-shared"), TieredCache("test-shared")
+        first.get_or_set("k", lambda: "value")
+        self.assertEqual(second.get_or_set("k", lambda: self.fail("built twice")), "value")
+
+    def test_version_change_retires_entries(self):
+        version = ["v1"]
+        tiered = TieredCache("test-version", version=lambda: version[0])
+        tiered.get_or_set("k", lambda: "old")
+        version[0] = "v2"
+        self.assertEqual(tiered.get_or_set("k", lambda: "new"), "new")
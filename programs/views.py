@@ -3,6 +3,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser, AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.tokens import default_token_generator
@@ -11,7 +16,6 @@ from django.utils.encoding import force_bytes, force_str
 from rest_framework_simplejwt.tokens import RefreshToken
 
 # Local Imports
-from .models import Exercise, WorkoutSlotLogic
 from .serializers import (
     ExerciseSerializer,
     WorkoutResultSerializer,
@@ -21,13 +25,24 @@ from .serializers import (
 )
 from .services.recommender import WorkoutService
 from .services.scheduler import SchedulerService
-from .emails import send_brevo_email # Brevo email function
+from .services.slot_plans import SlotPlanService
+from .services.weekly_plans import WeeklyPlanService, mark_dirty
+from .services.schedule_export import ScheduleExporter
+from .services.training_age_bulk import TrainingAgeBulkUpdater, UpdateFormatError, format_for, iter_rows
+from .models import WeeklyPlanDirty
+from .auth import ClaimsJWTAuthentication, record_login
+from .outbox import enqueue_email # Queued for the send_outbox_emails worker
+from .metrics import registry as metrics_registry
+from .profiling import capture_path, list_captures
+from .warmup import status as warmup_status
 import random
 
 
 # Global Instances
 workout_service = WorkoutService()
 scheduler_service = SchedulerService()
+slot_plan_service = SlotPlanService()
+weekly_plan_service = WeeklyPlanService(scheduler=scheduler_service, slot_plans=slot_plan_service)
 
 # --- AUTHENTICATION VIEWS ---
 
@@ -52,7 +67,7 @@ class SignupAPI(APIView):
                     'username': user.username,
                     'verify_link': verify_link # <--- Signup email mein link chahiye
                 }
-                send_brevo_email(subject, 'emails/signup_welcome.html', context, user.email)
+                enqueue_email(subject, 'emails/signup_welcome.html', context, user.email)
             
             return Response({"detail": "User created. Verification email sent!"}, status=201)
         return Response(serializer.errors, status=400)
@@ -87,15 +102,12 @@ class VerifyEmailAndSendOTP(APIView):
                 'otp': otp_code
             }
             
-            email_status = send_brevo_email(subject, 'emails/otp_email.html', context, user.email)
+            enqueue_email(subject, 'emails/otp_email.html', context, user.email)
 
-            if email_status:
-                return Response({
-                    "detail": "Email verified! An OTP has been sent to your inbox.",
-                    "username": user.username
-                }, status=200)
-            else:
-                return Response({"detail": "Verified, but failed to send OTP email."}, status=500)
+            return Response({
+                "detail": "Email verified! An OTP has been sent to your inbox.",
+                "username": user.username
+            }, status=200)
         
         return Response({"detail": "This link is invalid or has expired."}, status=400)
 
@@ -103,11 +115,12 @@ class LoginAndGetJWT(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
-            username = serializer.validated_data['username']
-            user = User.objects.get(username=username)
-            login(request, user) 
+            if settings.LOGIN_SESSION:
+                login(request, serializer.user)  # session row + last_login, for browser clients
+            else:
+                record_login(serializer.user)  # JWT only: no session, last_login per LAST_LOGIN_MODE
             return Response(serializer.validated_data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_401_UNAUTHORIZED)
 
@@ -131,7 +144,7 @@ class ForgetPasswordRequestAPI(APIView):
             # Send Email
             subject = "Password Reset Request"
             context = {'username': user.username, 'reset_link': reset_link}
-            send_brevo_email(subject, 'emails/reset_password.html', context, email)
+            enqueue_email(subject, 'emails/reset_password.html', context, email)
             
             # Yahan hum response mein uid aur token bhej rahe hain testing ke liye
             return Response({
@@ -158,7 +171,7 @@ class VerifyResetLinkAndSendOTP(APIView):
             otp_code = str(random.randint(100000, 999999))
             profile = user.profile
             profile.otp = otp_code
-            profile.save()
+            profile.save(update_fields=["otp"])
 
             # Send the OTP Email (reset_otp.html)
             subject = "Your Security OTP Code"
@@ -166,7 +179,7 @@ class VerifyResetLinkAndSendOTP(APIView):
                 'username': user.username,
                 'otp': otp_code
             }
-            send_brevo_email(subject, 'emails/reset_otp.html', context, user.email)
+            enqueue_email(subject, 'emails/reset_otp.html', context, user.email)
 
             # Redirect user to frontend OTP screen or show success
             return Response({
@@ -199,7 +212,7 @@ class FinalPasswordResetAPI(APIView):
             user.set_password(new_password)
             user.save()
             profile.otp = None # Clear OTP after use
-            profile.save()
+            profile.save(update_fields=["otp"])
             return Response({"detail": "Password updated successfully!"})
         
         return Response({"detail": "Invalid OTP."}, status=400)
@@ -216,31 +229,82 @@ class FullWorkoutAPI(APIView):
             )
 
         try:
-            workout = workout_service.daily_workout(categories, int(training_age))
+            if request.data.get("seeded"):
+                # Same user + day + inputs -> same workout (memoized)
+                workout = workout_service.seeded_daily_workout(request.user.id, categories, int(training_age))
+            else:
+                workout = workout_service.daily_workout(categories, int(training_age))
             serializer = WorkoutResultSerializer(workout, many=True)
             return Response(serializer.data)
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
+class BatchWorkoutAPI(APIView):
+    """
+    POST {"requests": [{"categories": [...], "training_age": n}, ...]}
+    -> one result per request, all built from a single catalog snapshot.
+    """
+    MAX_BATCH_SIZE = 500
+
+    def post(self, request):
+        items = request.data.get("requests")
+
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"detail": "'requests' must be a non-empty list."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.MAX_BATCH_SIZE:
+            return Response(
+                {"detail": f"At most {self.MAX_BATCH_SIZE} requests per batch."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        parsed = []
+        for idx, item in enumerate(items):
+            categories = item.get("categories") if isinstance(item, dict) else None
+            training_age = item.get("training_age") if isinstance(item, dict) else None
+            try:
+                # Categories are snapshot dict keys: anything but a string would be unhashable
+                if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+                    raise ValueError
+                if training_age is None:
+                    raise ValueError
+                parsed.append((categories, int(training_age)))
+            except (TypeError, ValueError):
+                return Response(
+                    {"detail": f"requests[{idx}]: 'categories' (list of strings) and integer 'training_age' are required."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        results = []
+        for result in workout_service.daily_workouts(parsed):
+            if "workout" in result:
+                result = {"workout": WorkoutResultSerializer(result["workout"], many=True).data}
+            results.append(result)
+
+        return Response({"results": results})
+
+def _render_all_categories(snapshot):
+    data = [
+        {
+            "category": cat,
+            "subcategories": [
+                {"id": e.id, "name": e.name} for e in exercises
+            ]
+        }
+        for cat, exercises in snapshot.by_category.items()
+    ]
+    return JSONRenderer().render(data)
+
+
 class AllCategoriesWithExercisesAPI(APIView):
     permission_classes = [AllowAny] # Sab dekh sakte hain
 
     def get(self, request):
-        categories = Exercise.objects.values_list(
-            "category", flat=True
-        ).distinct()
-
-        data = []
-        for cat in categories:
-            exercises = Exercise.objects.filter(category=cat)
-            data.append({
-                "category": cat,
-                "subcategories": [
-                    {"id": e.id, "name": e.name} for e in exercises
-                ]
-            })
-
-        return Response(data)
+        # Body is rendered once per catalog version; afterwards this is a dict lookup
+        body = workout_service.catalog.get().memo("all-categories.json", _render_all_categories)
+        return HttpResponse(body, content_type="application/json")
     
 class AdminUpdateTrainingAgeAPI(APIView):
     permission_classes = [IsAdminUser] # Sirf admin change kar sakta hai
@@ -261,8 +325,11 @@ class AdminUpdateTrainingAgeAPI(APIView):
             return Response({"detail": "'training_age' must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
 
         profile = user.profile
+        changed = profile.training_age != new_age
         profile.training_age = new_age
         profile.save()
+        if changed:
+            mark_dirty([user.pk], WeeklyPlanDirty.REASON_TRAINING_AGE)  # refresh_weekly_plans rebuilds their week
         
         return Response({
             "detail": "training_age updated", 
@@ -270,6 +337,30 @@ class AdminUpdateTrainingAgeAPI(APIView):
             "new_training_age": profile.training_age
         })
 
+class BulkTrainingAgeUpdateAPI(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        """
+        Body is a CSV (username,training_age), a JSON list or NDJSON, either raw (by
+        Content-Type) or as a multipart "file" upload (by extension). ?dry_run=1 reports
+        without saving. The body is read as a stream, never loaded through request.data.
+        """
+        upload = request.FILES.get("file") if request.content_type.startswith("multipart/") else None
+        if upload is not None:
+            stream, fmt = upload, format_for(upload.name)
+        else:
+            stream, fmt = request.stream, format_for(request.content_type)
+        if fmt is None or stream is None:
+            return Response({"detail": "Send a .csv, .json or .ndjson body or file."}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = request.query_params.get("dry_run") in ("1", "true")
+        try:
+            report = TrainingAgeBulkUpdater().run(iter_rows(stream, fmt), dry_run=dry_run)
+        except UpdateFormatError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"dry_run": dry_run, **report.as_dict()})
+
 class PasswordResetConfirmAPI(APIView):
     permission_classes = [AllowAny]
 
@@ -294,41 +385,18 @@ class PasswordResetConfirmAPI(APIView):
 # --- GYM LOGIC VIEWS ---
 
 class UserScheduleAPI(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]  # read-only: may trust token claims
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         profile = request.user.profile
-        user_month = profile.current_training_month
-        
-        if profile.training_age <= 1:
-            bracket = "0-1"
-        elif profile.training_age <= 4:
-            bracket = "2-4"
-        else:
-            bracket = "5+"
+        # materialized on the profile; recomputed in memory only if the nightly refresh is behind
+        user_month, bracket, current_phase = profile.current_training_state()
 
-        current_phase = 1 if user_month <= 4 else 2
-
-        slots = WorkoutSlotLogic.objects.filter(
-            training_bracket=bracket,
-            phase=current_phase
-        ).order_by('slot_number')
-
-        if not slots.exists():
+        plan_data = slot_plan_service.schedule_plan(bracket, current_phase)
+        if not plan_data:
             return Response({"detail": "No workout plan found for your level."}, status=404)
 
-        plan_data = []
-        for s in slots:
-            plan_data.append({
-                "slot_id": s.slot_number,
-                "pattern": s.movement_pattern,
-                "options": {
-                    "starting_exercise": s.base_exercise,
-                    "if_too_easy": s.progression_exercise,
-                    "if_too_hard": s.regression_exercise
-                }
-            })
-
         serializer = UserProfileSerializer(profile)
         return Response({
             "profile": serializer.data,
@@ -338,19 +406,24 @@ class UserScheduleAPI(APIView):
             "16_slot_plan": plan_data
         })
 
+class MyWeekAPI(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]  # read-only: may trust token claims
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # Stored per user per week; only regenerated when their inputs changed
+        plan = weekly_plan_service.for_user(request.user.id, request.user.profile)
+        return Response(weekly_plan_service.payload(plan))
+
 class MyWorkoutOptionsAPI(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]  # read-only: may trust token claims
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user_month = request.user.profile.current_training_month
-        training_age = request.user.profile.training_age
-        
-        bracket = "0-1" if training_age <= 1 else ("2-4" if training_age <= 4 else "5+")
-        phase = 1 if user_month <= 4 else 2 
+        profile = request.user.profile
+        user_month, bracket, phase = profile.current_training_state()
 
-        slots = WorkoutSlotLogic.objects.filter(training_bracket=bracket, phase=phase).order_by('slot_number')
-        
-        results = [{"slot_id": s.slot_number, "pattern": s.movement_pattern, "options": {"base": s.base_exercise, "progression": s.progression_exercise, "regression": s.regression_exercise}} for s in slots]
+        results = slot_plan_service.options_plan(bracket, phase)
 
         return Response({"month": user_month, "bracket": bracket, "phase": phase, "workout": results})
 
@@ -371,4 +444,59 @@ class ExerciseDetailAPI(APIView):
             data = workout_service.get_exercise_plan(exercise_id, int(training_age))
             return Response(WorkoutResultSerializer(data).data)
         except Exception as e:
-            return Response({"detail": str(e)}, status=400)
\ No newline at end of file
+            return Response({"detail": str(e)}, status=400)
+
+# --- OPS VIEWS ---
+
+class MetricsAPI(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # Prometheus text format, summed over every worker that flushed to METRICS_DIR
+        return HttpResponse(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ReadinessAPI(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        # 503 until programs.warmup has run here (or in the master this worker forked from)
+        state = warmup_status()
+        return Response(state, status=status.HTTP_200_OK if state["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class ScheduleExportAPI(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # One NDJSON line per member, streamed; ?gzip=1 compresses on the fly
+        gzip = request.query_params.get("gzip") in ("1", "true")
+        exporter = ScheduleExporter(slot_plans=slot_plan_service)
+        filename = f"schedules-{timezone.now().date().isoformat()}.ndjson" + (".gz" if gzip else "")
+        # An async iterator under ASGI, which would otherwise buffer the whole export
+        asgi = isinstance(request._request, ASGIRequest)
+        response = StreamingHttpResponse(
+            exporter.achunks(gzip=gzip) if asgi else exporter.chunks(gzip=gzip),
+            content_type="application/gzip" if gzip else "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ProfileListAPI(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # newest first; see ProfilingMiddleware for how captures are triggered
+        return Response(list_captures())
+
+
+class ProfileDownloadAPI(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, filename):
+        path = capture_path(filename)
+        if path is None:
+            raise Http404("Profile not found")
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=filename)
@@ -0,0 +1,61 @@
+# programs/warmup.py
+#
+# Boot-time warm-up. warm() imports the views (and with them the Brevo SDK), builds
+# the exercise/prescription catalog and slot-plan snapshots and renders their memoized
+# payloads. config/gunicorn.py calls it in the master before forking, so every worker
+# starts with the same snapshots shared copy-on-write. The readiness endpoint reports
+# ready only once it has run in this process (or in the master it was forked from).
+
+import logging
+import os
+import threading
+import time
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {"ready": False, "warmed_at": None, "duration_ms": None, "warmed_by": None}
+
+
+def warm():
+    """
+    Build and memoize every snapshot the read paths use. Safe to call again; returns a summary.
+    """
+    from .views import _render_all_categories, slot_plan_service, workout_service
+
+    with _lock:
+        started = time.perf_counter()
+        catalog = workout_service.catalog.get()
+        catalog.memo("all-categories.json", _render_all_categories)
+        catalog.fingerprint
+        for level in catalog.by_level:
+            catalog.level_fingerprint(level)
+        slots = slot_plan_service.provider.get()
+
+        # Nothing may carry an open DB socket into the forked workers
+        connections.close_all()
+
+        _state.update(
+            ready=True,
+            warmed_at=time.time(),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            warmed_by=os.getpid(),
+        )
+        summary = {
+            "exercises": len(catalog.exercises),
+            "prescriptions": len(catalog.prescriptions),
+            "slot_plans": len(slots.keys()),
+            "duration_ms": _state["duration_ms"],
+        }
+    logger.info("Warm-up done: %s", summary)
+    return summary
+
+
+def is_ready():
+    return _state["ready"]
+
+
+def status():
+    return {**_state, "pid": os.getpid()}